@@ -0,0 +1,129 @@
+"""
+Задержка event loop из-за логов: прежний StreamHandler прямо в потоке loop
+против очереди с записью в отдельном потоке (без выборки и с выборкой).
+
+Нагрузка похожа на get_schedule: на запрос три INFO-строки, на каждый
+--error-every запрос - ERROR с телом ответа API в --body-size символов.
+Вывод идёт в медленный поток (--sink-delay мс на запись), как stdout,
+упирающийся в переполненный pipe или драйвер логов контейнера.
+Задержку loop меряет задача, которая просыпается каждую миллисекунду;
+"без логов" - та же нагрузка с NullHandler, для сравнения.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_logging [--requests 5000] [--sink-delay 0.2]
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+
+from log_pipeline import JsonFormatter, create_queue_handler, truncate
+
+
+class SlowStream:
+    def __init__(self, delay):
+        self.delay = delay
+        self.lines = 0
+
+    def write(self, text):
+        # Блокирующая запись, как в занятый pipe
+        time.sleep(self.delay)
+        self.lines += text.count("\n")
+
+    def flush(self):
+        pass
+
+
+async def probe(lags, stop, interval=0.001):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lags.append(loop.time() - expected)
+
+
+async def workload(logger, args, truncate_body):
+    body = "<html>" + "x" * args.body_size + "</html>"
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def request(number):
+        async with semaphore:
+            logger.info(f"📅 Запрашиваем расписание: группа ИСП-{number % 50}, день {number % 6 + 1}")
+            await asyncio.sleep(0)
+            logger.info("📡 Статус получения расписания: 200")
+            await asyncio.sleep(0)
+            if number % args.error_every == 0:
+                text = truncate(body, args.body_limit) if truncate_body else body
+                logger.error(f"🚫 Ошибка запроса расписания: HTTP 502: {text}")
+            else:
+                logger.info("✅ Расписание получено!")
+
+    await asyncio.gather(*(request(number) for number in range(args.requests)))
+
+
+async def run_mode(mode, args):
+    stream = SlowStream(args.sink_delay / 1000)
+    target = logging.StreamHandler(stream)
+    listener = None
+    if mode == "без логов":
+        handler = logging.NullHandler()
+    elif mode == "прямо в loop":
+        target.setFormatter(logging.Formatter("%(levelname)s:%(name)s:%(message)s"))
+        handler = target
+    else:
+        target.setFormatter(JsonFormatter())
+        sample_rate = args.sample_rate if mode == "очередь + выборка" else 0
+        handler, listener = create_queue_handler(target, sample_rate, args.sample_burst)
+        listener.start()
+
+    logger = logging.getLogger(f"bench.{mode}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+
+    lags = []
+    stop = asyncio.Event()
+    prober = asyncio.create_task(probe(lags, stop))
+    await asyncio.sleep(0.01)
+
+    started = time.perf_counter()
+    await workload(logger, args, truncate_body=mode != "прямо в loop")
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await prober
+    logger.removeHandler(handler)
+    drain_started = time.perf_counter()
+    if listener is not None:
+        listener.stop()
+    drain = time.perf_counter() - drain_started
+
+    lags.sort()
+    print(
+        f"{mode:18} {args.requests / elapsed:9.0f} запр/с  "
+        f"лаг p50 {statistics.median(lags) * 1000:6.2f}мс  "
+        f"p99 {lags[int(len(lags) * 0.99)] * 1000:7.2f}мс  "
+        f"макс {lags[-1] * 1000:7.2f}мс  "
+        f"строк {stream.lines:6}  дозапись {drain:.2f}с"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--sink-delay", type=float, default=0.2, help="мс на одну запись в вывод")
+    parser.add_argument("--error-every", type=int, default=50)
+    parser.add_argument("--body-size", type=int, default=20000)
+    parser.add_argument("--body-limit", type=int, default=500)
+    parser.add_argument("--sample-rate", type=float, default=10)
+    parser.add_argument("--sample-burst", type=int, default=50)
+    args = parser.parse_args()
+
+    for mode in ("без логов", "прямо в loop", "очередь", "очередь + выборка"):
+        asyncio.run(run_mode(mode, args))
+
+
+if __name__ == "__main__":
+    main()
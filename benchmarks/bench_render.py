@@ -0,0 +1,143 @@
+"""
+Микро-бенчмарк рендера расписания: прежние format_schedule_response +
+split_long_message против ScheduleRenderer (без кеша и с кешем) на
+больших расписаниях с множеством пар.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_render [--lessons 8,40,200] [--repeat 2000]
+"""
+import argparse
+import random
+import timeit
+
+from renderer import ScheduleRenderer
+
+LESSON_TIMES = {
+    1: "8:30-10:00",
+    2: "10:10-11:40",
+    3: "12:10-13:40",
+    4: "14:00-15:30",
+    5: "15:40-17:10",
+    6: "17:20-18:50",
+    7: "19:00-20:30",
+    8: "20:40-22:10"
+}
+
+DAYS_NAMES = {1: "Понедельник", 2: "Вторник", 3: "Среда", 4: "Четверг", 5: "Пятница", 6: "Суббота"}
+
+
+def legacy_split_long_message(text, max_length=4000):
+    # Прежняя версия из main.py
+    if len(text) <= max_length:
+        return [text]
+    parts = []
+    while text:
+        if len(text) <= max_length:
+            parts.append(text)
+            break
+        split_pos = text.rfind('\n', 0, max_length)
+        if split_pos == -1:
+            split_pos = text.rfind(' ', 0, max_length)
+            if split_pos == -1:
+                split_pos = max_length
+        parts.append(text[:split_pos])
+        text = text[split_pos:].lstrip()
+    return parts
+
+
+def legacy_format_schedule_response(schedule_data, group_id, day_number, day_prefix=""):
+    # Прежняя версия из main.py
+    day_name = DAYS_NAMES[day_number]
+    day_display = f"{day_prefix} ({day_name})" if day_prefix else day_name
+    response = f"📅 <b>{group_id} - {day_display}</b>\n\n"
+    if isinstance(schedule_data, dict) and "lessons" in schedule_data:
+        lessons = schedule_data["lessons"]
+        if lessons:
+            lesson_times = {
+                1: "8:30-10:00",
+                2: "10:10-11:40",
+                3: "12:10-13:40",
+                4: "14:00-15:30",
+                5: "15:40-17:10",
+                6: "17:20-18:50",
+                7: "19:00-20:30",
+                8: "20:40-22:10"
+            }
+            for lesson in lessons:
+                lesson_num = lesson.get("lesson_num", 0)
+                time_slot = lesson_times.get(lesson_num, "??:??")
+                response += f"<b>🕒 {time_slot}</b>\n"
+                response += f"   {lesson.get('subject', 'Предмет не указан')}\n"
+                teacher = lesson.get('teacher', '')
+                classroom = lesson.get('classroom', '')
+                if teacher and classroom:
+                    response += f"   👨‍🏫 {teacher} | 🏫 {classroom}\n"
+                elif teacher:
+                    response += f"   👨‍🏫 {teacher}\n"
+                elif classroom:
+                    response += f"   🏫 {classroom}\n"
+                response += "\n"
+        else:
+            response += "🎉 <b>Занятий нет! Отдыхай!</b> 😊\n"
+    else:
+        response += "❌ <b>Расписание не найдено</b>\n"
+    return response
+
+
+def make_schedule(lessons, seed):
+    rnd = random.Random(seed)
+    return {
+        "lessons": [
+            {
+                "lesson_num": n % 8 + 1,
+                "subject": f"Предмет {rnd.randrange(1000)} " + "и ещё немного текста " * rnd.randrange(1, 4),
+                "teacher": f"Преподаватель {rnd.randrange(200)}" if rnd.random() > 0.1 else "",
+                "classroom": str(rnd.randrange(100, 500)) if rnd.random() > 0.1 else "",
+            }
+            for n in range(lessons)
+        ]
+    }
+
+
+def bench(label, fn, repeat):
+    seconds = min(timeit.repeat(fn, number=repeat, repeat=3))
+    print(f"    {label:<28} {seconds / repeat * 1e6:10.1f} мкс/сообщение")
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lessons", default="8,40,200")
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    for lessons in (int(n) for n in args.lessons.split(",")):
+        schedule = make_schedule(lessons, lessons)
+        renderer = ScheduleRenderer(LESSON_TIMES, DAYS_NAMES)
+
+        legacy_text = legacy_format_schedule_response(schedule, "ISP-101", 1, "сегодня")
+        assert renderer.render(schedule, "ISP-101", 1, "сегодня") == legacy_text
+        parts = renderer.render_parts(schedule, "ISP-101", 1, "сегодня")
+        assert all(len(part) <= 4000 for part in parts)
+
+        print(f"Пар: {lessons}, длина {len(legacy_text)} символов, частей {len(parts)}")
+        legacy = bench(
+            "прежний рендер + split",
+            lambda: legacy_split_long_message(legacy_format_schedule_response(schedule, "ISP-101", 1, "сегодня")),
+            args.repeat,
+        )
+        built = bench(
+            "ScheduleRenderer без кеша",
+            lambda: renderer._build(schedule, "ISP-101", 1, "сегодня"),
+            args.repeat,
+        )
+        cached = bench(
+            "ScheduleRenderer с кешем",
+            lambda: renderer.render_parts(schedule, "ISP-101", 1, "сегодня"),
+            args.repeat,
+        )
+        print(f"    ускорение: без кеша x{legacy / built:.2f}, с кешем x{legacy / cached:.2f}")
+
+
+if __name__ == "__main__":
+    main()
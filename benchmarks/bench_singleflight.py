@@ -0,0 +1,70 @@
+"""
+Бенчмарк склейки запросов: всплеск одинаковых запросов расписания после звонка.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_singleflight [--requests 1000] [--groups 10]
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from singleflight import SingleFlight
+
+
+class FakeUpstream:
+    """
+    Имитация /get-schedule с задержкой и счётчиком запросов
+    """
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+
+    async def get_schedule(self, group_id, day_of_week):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return {"lessons": [], "group_id": group_id, "day_of_week": day_of_week}
+
+
+async def run_burst(keys, latency, coalesce):
+    upstream = FakeUpstream(latency)
+    flight = SingleFlight()
+
+    async def handler(group_id, day_of_week):
+        if coalesce:
+            return await flight.do(
+                (group_id, day_of_week),
+                lambda: upstream.get_schedule(group_id, day_of_week),
+            )
+        return await upstream.get_schedule(group_id, day_of_week)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(handler(g, d) for g, d in keys))
+    elapsed = time.perf_counter() - started
+
+    assert all(r["group_id"] == g for r, (g, _) in zip(results, keys))
+    return upstream.calls, elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--groups", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    rnd = random.Random(42)
+    keys = [(f"G-{rnd.randrange(args.groups)}", rnd.randint(1, 6)) for _ in range(args.requests)]
+
+    naive_calls, naive_time = await run_burst(keys, args.latency, coalesce=False)
+    flight_calls, flight_time = await run_burst(keys, args.latency, coalesce=True)
+
+    print(f"Всплеск: {args.requests} запросов, {len(set(keys))} уникальных ключей")
+    print(f"  без склейки:  {naive_calls:6d} запросов к API, {naive_time:.3f}s")
+    print(f"  со склейкой:  {flight_calls:6d} запросов к API, {flight_time:.3f}s")
+    print(f"  снижение нагрузки на API: x{naive_calls / max(flight_calls, 1):.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
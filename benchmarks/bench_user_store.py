@@ -0,0 +1,56 @@
+"""
+Бенчмарк хранилища групп: пакетная запись и загрузка при старте.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_user_store [--users 500000]
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from user_store import SqliteUserGroupStore
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=500_000)
+    parser.add_argument("--groups", type=int, default=300)
+    args = parser.parse_args()
+
+    rnd = random.Random(42)
+    groups = [f"ИСП-{n}" for n in range(args.groups)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "users.db")
+
+        store = SqliteUserGroupStore(path, batch_size=10_000)
+        await store.load()
+        store.start()
+
+        started = time.perf_counter()
+        for user_id in range(args.users):
+            store[user_id] = rnd.choice(groups)
+            if user_id % 10_000 == 0:
+                # Даём фоновой задаче сбросить пачку, как между апдейтами
+                await asyncio.sleep(0)
+        set_time = time.perf_counter() - started
+        await store.close()
+        write_time = time.perf_counter() - started
+
+        store = SqliteUserGroupStore(path)
+        await store.load()
+        assert len(store) == args.users
+        await store.close()
+
+        print(f"Пользователей: {args.users}, групп: {args.groups}")
+        print(f"  запись в индекс:      {set_time:.2f}s")
+        print(f"  запись с сохранением: {write_time:.2f}s")
+        print(f"  загрузка при старте:  {store.load_seconds:.2f}s")
+        print(f"  размер базы:          {os.path.getsize(path) / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
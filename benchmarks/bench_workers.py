@@ -0,0 +1,162 @@
+"""
+Бенчмарк масштабирования по воркерам: пропускная способность настоящего
+бота в режиме WORKERS=1, 2, 4... процессов.
+
+Каждый воркер - main.worker_main как в проде (общее SQLite-хранилище,
+шардирование пользователей, dp.feed_raw_update), только bot.session
+подменён FakeSession, а API расписания - MockScheduleApi в отдельном
+процессе. Апдейты те же, что в load_test: сначала пользователь выбирает
+группу, дальше day_*, today и изредка /start. Время - от первого
+dispatch до того, как воркеры разобрали очереди и остановились.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_workers [--updates 20000] [--workers 1,2,4]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import socket
+import tempfile
+import time
+
+from workers import WorkerPool
+
+
+def serve_api(port, groups, latency):
+    from aiohttp import web
+
+    from benchmarks.mock_api import MockScheduleApi, make_groups
+
+    api = MockScheduleApi(make_groups(groups), latency=latency, jitter=0)
+    web.run_app(api.make_app(), host="127.0.0.1", port=port, print=None)
+
+
+def wait_for_port(port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.1):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"заглушка API не поднялась на порту {port}")
+
+
+def configure(args, workers, data_dir):
+    """
+    Окружение для воркеров: spawn передаёт его дочерним процессам,
+    main читает настройки при импорте
+    """
+    os.environ["WORKERS"] = str(workers)
+    os.environ["USER_DB_PATH"] = os.path.join(data_dir, "ebot.db")
+    os.environ["SHARED_DB_PATH"] = os.path.join(data_dir, "shared.db")
+    os.environ["API_BASE_URL"] = f"http://127.0.0.1:{args.api_port}"
+    os.environ["API_RATE_LIMIT"] = str(args.api_rate)
+    os.environ["TG_GLOBAL_RATE"] = "100000"
+    os.environ["TG_PER_CHAT_INTERVAL"] = "0"
+    os.environ["METRICS_PORT"] = "0"
+    os.environ.setdefault("BOT_TOKEN", "123456:bench-workers")
+    os.environ.setdefault("API_USERNAME", "bench")
+    os.environ.setdefault("API_PASSWORD", "bench")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    for name in ("CRAWL_ENABLED", "PREWARM_ENABLED", "BROADCAST_ENABLED", "SNAPSHOT_ENABLED"):
+        os.environ.setdefault(name, "0")
+
+
+def bench_worker(index, count, updates, ready, telegram_latency):
+    import main as bot_main
+    from benchmarks.fake_telegram import FakeSession
+
+    bot_main.bot.session = FakeSession(latency=telegram_latency)
+    startup = bot_main.startup
+
+    async def startup_and_report(**kwargs):
+        # Сообщаем родителю, что воркер готов: запуск в замер не входит
+        started = await startup(**kwargs)
+        ready.put(started)
+        return started
+
+    bot_main.startup = startup_and_report
+    asyncio.run(bot_main.worker_main(index, count, updates))
+
+
+def make_updates(args):
+    from benchmarks.fake_telegram import UpdateFactory
+    from benchmarks.mock_api import make_groups
+
+    rng = random.Random(args.seed)
+    groups = make_groups(args.groups)
+    factory = UpdateFactory()
+    users = [100000 + n for n in range(args.users)]
+
+    updates = [
+        factory.callback(user_id, f"group_{rng.choices(groups, weights=[1 / (n + 1) for n in range(len(groups))])[0]}")
+        for user_id in users
+    ]
+    while len(updates) < args.updates:
+        user_id = rng.choice(users)
+        roll = rng.random()
+        if roll < 0.1:
+            updates.append(factory.command(user_id, "/start"))
+        elif roll < 0.45:
+            updates.append(factory.callback(user_id, "today"))
+        else:
+            updates.append(factory.callback(user_id, f"day_{rng.randint(1, 6)}"))
+    return updates[:args.updates]
+
+
+def run(workers, updates, args):
+    with tempfile.TemporaryDirectory() as data_dir:
+        configure(args, workers, data_dir)
+        ready = multiprocessing.get_context("spawn").Queue()
+        pool = WorkerPool(workers, bench_worker, args=(ready, args.telegram_latency), queue_size=len(updates))
+        pool.start()
+        started_ok = [ready.get() for _ in range(workers)]
+        if not all(started_ok):
+            pool.close()
+            raise RuntimeError("воркер не смог войти в заглушку API")
+
+        started = time.perf_counter()
+        for update in updates:
+            while not pool.dispatch(update):
+                time.sleep(0.001)
+        pool.close()
+        return len(updates) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=20000)
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--groups", type=int, default=50)
+    parser.add_argument("--api-port", type=int, default=8091)
+    parser.add_argument("--api-latency", type=float, default=0.02)
+    parser.add_argument("--api-rate", type=float, default=1000, help="API_RATE_LIMIT бота")
+    parser.add_argument("--telegram-latency", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    api = multiprocessing.get_context("spawn").Process(
+        target=serve_api, args=(args.api_port, args.groups, args.api_latency), daemon=True
+    )
+    api.start()
+    try:
+        wait_for_port(args.api_port)
+        updates = make_updates(args)
+
+        baseline = None
+        print(f"Апдейтов: {len(updates)}, пользователей: {args.users}, CPU ядер: {os.cpu_count()}")
+        for workers in (int(n) for n in args.workers.split(",")):
+            throughput = run(workers, updates, args)
+            baseline = baseline or throughput
+            print(f"  воркеров {workers}: {throughput:8.0f} апдейтов/с (x{throughput / baseline:.2f})")
+    finally:
+        api.terminate()
+        api.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Нагрузочный прогон бота: синтетические апдейты /start, group_*, day_* и
+today идут прямо в dp, Bot API подменён FakeSession, API расписания -
+локальная MockScheduleApi (задержка, 401/429/404, истечение токена).
+
+Апдейты приходят пачками по --burst каждые --burst-interval секунд.
+Сначала пользователи знакомятся с ботом (/start и выбор группы), затем
+в основном day_* и today, изредка /start. Группы выбираются неравномерно
+(большие группы популярнее). Время апдейта - от feed_raw_update до
+возврата, хендлеры при этом ждут доставки своих сообщений.
+
+Отчёт: апдейтов в секунду, p50/p99 по всем апдейтам и по типам, запросов
+к API на апдейт. С --max-p99 и --max-upstream-per-update прогон
+завершается с кодом 1, если порог превышен.
+
+Запуск из корня репозитория:
+    python -m benchmarks.load_test [--users 1000] [--updates 5000] [--p429 0.01] [--token-ttl 5]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+
+
+def configure(args):
+    """
+    Настройки бота до импорта main: фоновые задачи, которые сами ходят
+    в API, выключены, лимиты Telegram не мешают мерить хендлеры
+    """
+    os.environ["API_BASE_URL"] = f"http://127.0.0.1:{args.api_port}"
+    os.environ["API_RATE_LIMIT"] = str(args.api_rate)
+    os.environ["TG_GLOBAL_RATE"] = str(args.tg_rate)
+    os.environ["TG_PER_CHAT_INTERVAL"] = "0"
+    os.environ.setdefault("BOT_TOKEN", "123456:load-test")
+    os.environ.setdefault("API_USERNAME", "load")
+    os.environ.setdefault("API_PASSWORD", "load")
+    os.environ.setdefault("USER_STORE", "memory")
+    os.environ.setdefault("USER_DB_PATH", os.path.join(tempfile.mkdtemp(), "load_test.db"))
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    for name in ("CRAWL_ENABLED", "PREWARM_ENABLED", "BROADCAST_ENABLED", "SNAPSHOT_ENABLED"):
+        os.environ.setdefault(name, "0")
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def run(args):
+    configure(args)
+    import main as bot_main
+    from benchmarks.fake_telegram import FakeSession, UpdateFactory
+    from benchmarks.mock_api import MockScheduleApi, make_groups
+
+    rng = random.Random(args.seed)
+    groups = make_groups(args.groups)
+    missing = rng.sample(groups, int(len(groups) * args.p404))
+    api = MockScheduleApi(
+        groups,
+        latency=args.api_latency,
+        jitter=args.api_jitter,
+        p401=args.p401,
+        p429=args.p429,
+        retry_after=args.retry_after,
+        missing=missing,
+        token_ttl=args.token_ttl,
+        seed=args.seed,
+    )
+    api_runner = await api.start(port=args.api_port)
+
+    session = FakeSession(latency=args.telegram_latency)
+    bot_main.bot.session = session
+    if not await bot_main.startup(prewarm=False, broadcast=False, metrics_port=0):
+        print("❌ Бот не смог войти в заглушку API")
+        await api_runner.cleanup()
+        return 1
+    api.calls.clear()
+
+    factory = UpdateFactory()
+    latencies = defaultdict(list)
+    failed = Counter()
+
+    async def feed(kind, update):
+        started = time.perf_counter()
+        try:
+            await bot_main.dp.feed_raw_update(bot_main.bot, update)
+        except Exception as e:
+            failed[kind] += 1
+            if failed[kind] == 1:
+                print(f"🚫 {kind}: {e!r}")
+        latencies[kind].append(time.perf_counter() - started)
+
+    async def onboard(user_id):
+        await feed("start", factory.command(user_id, "/start"))
+        group_id = rng.choices(groups, weights=[1 / (n + 1) for n in range(len(groups))])[0]
+        await feed("group", factory.callback(user_id, f"group_{group_id}"))
+
+    users = [100000 + n for n in range(args.users)]
+    started = time.perf_counter()
+    onboarding = []
+    for offset in range(0, len(users), args.burst):
+        onboarding.extend(asyncio.create_task(onboard(user_id)) for user_id in users[offset:offset + args.burst])
+        await asyncio.sleep(args.burst_interval)
+    await asyncio.gather(*onboarding)
+    onboarded_in = time.perf_counter() - started
+
+    tasks = []
+    burst_started = time.perf_counter()
+    for offset in range(0, args.updates, args.burst):
+        for _ in range(min(args.burst, args.updates - offset)):
+            user_id = rng.choice(users)
+            roll = rng.random()
+            if roll < args.p_start:
+                kind, update = "start", factory.command(user_id, "/start")
+            elif roll < args.p_start + args.p_today:
+                kind, update = "today", factory.callback(user_id, "today")
+            else:
+                kind, update = "day", factory.callback(user_id, f"day_{rng.randint(1, 6)}")
+            tasks.append(asyncio.create_task(feed(kind, update)))
+        await asyncio.sleep(args.burst_interval)
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    burst_elapsed = time.perf_counter() - burst_started
+
+    cache = bot_main.schedule_cache.stats()
+    tokens = bot_main.token_manager.stats()
+    governor = bot_main.rate_governor.stats()
+    await bot_main.shutdown()
+    await api_runner.cleanup()
+
+    total = sum(len(values) for values in latencies.values())
+    everything = [value for values in latencies.values() for value in values]
+    schedule_calls = api.count("/get-schedule")
+    p99 = percentile(everything, 0.99)
+    upstream_per_update = schedule_calls / total if total else 0.0
+
+    print(
+        f"Апдейтов: {total} за {elapsed:.2f}с - {total / elapsed:.0f} апд/с "
+        f"(знакомство {args.users * 2} за {onboarded_in:.2f}с, "
+        f"пачки {args.updates} за {burst_elapsed:.2f}с)"
+    )
+    print(
+        f"  задержка p50 {percentile(everything, 0.5) * 1000:.1f}мс, "
+        f"p99 {p99 * 1000:.1f}мс, макс {max(everything) * 1000:.1f}мс"
+    )
+    for kind in ("start", "group", "day", "today"):
+        values = latencies.get(kind, [])
+        print(
+            f"  {kind:6} {len(values):6}  p50 {percentile(values, 0.5) * 1000:7.1f}мс  "
+            f"p99 {percentile(values, 0.99) * 1000:7.1f}мс  ошибок {failed[kind]}"
+        )
+    statuses = Counter()
+    for (path, status), count in api.calls.items():
+        if path == "/get-schedule":
+            statuses[status] += count
+    print(
+        f"  API: /get-schedule {schedule_calls} ({upstream_per_update:.3f} на апдейт, "
+        f"ответы {dict(sorted(statuses.items()))}), /login {api.count('/login')}, "
+        f"/refresh {api.count('/refresh')}"
+    )
+    print(
+        f"  кеш hit ratio {cache['hit_ratio']:.0%}, 429 у бота {governor['rate_limited']}, "
+        f"обновлений токена {tokens['refreshes']}, входов {tokens['logins']}"
+    )
+    print(f"  вызовы Bot API: {dict(session.calls)}")
+
+    code = 0
+    if sum(failed.values()):
+        print("❌ Хендлеры упали")
+        code = 1
+    if args.max_p99 and p99 > args.max_p99:
+        print(f"❌ p99 {p99:.3f}с больше порога {args.max_p99}с")
+        code = 1
+    if args.max_upstream_per_update and upstream_per_update > args.max_upstream_per_update:
+        print(f"❌ Запросов к API на апдейт {upstream_per_update:.3f} больше порога {args.max_upstream_per_update}")
+        code = 1
+    return code
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--groups", type=int, default=50)
+    parser.add_argument("--updates", type=int, default=5000)
+    parser.add_argument("--burst", type=int, default=100)
+    parser.add_argument("--burst-interval", type=float, default=0.2)
+    parser.add_argument("--p-start", type=float, default=0.1)
+    parser.add_argument("--p-today", type=float, default=0.35)
+    parser.add_argument("--api-port", type=int, default=8090)
+    parser.add_argument("--api-latency", type=float, default=0.05)
+    parser.add_argument("--api-jitter", type=float, default=0.05)
+    parser.add_argument("--api-rate", type=float, default=100, help="API_RATE_LIMIT бота")
+    parser.add_argument("--p401", type=float, default=0.0)
+    parser.add_argument("--p429", type=float, default=0.0)
+    parser.add_argument("--p404", type=float, default=0.05, help="доля групп без расписания")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--token-ttl", type=float, default=3600)
+    parser.add_argument("--tg-rate", type=float, default=10000, help="TG_GLOBAL_RATE бота")
+    parser.add_argument("--telegram-latency", type=float, default=0.005)
+    parser.add_argument("--max-p99", type=float, default=0, help="порог p99, секунды")
+    parser.add_argument("--max-upstream-per-update", type=float, default=0)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
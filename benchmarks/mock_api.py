@@ -0,0 +1,187 @@
+"""
+Локальная заглушка API расписания: /login, /refresh, /get-schedule и
+/get-groups с настраиваемой задержкой, ошибками и сроком жизни токена.
+
+MockScheduleApi используется в benchmarks.load_test; отдельно её можно
+поднять, чтобы запустить настоящего бота с API_BASE_URL=http://127.0.0.1:8090:
+    python -m benchmarks.mock_api [--port 8090] [--latency 0.05] [--p429 0.01]
+"""
+import argparse
+import asyncio
+import itertools
+import random
+from collections import Counter
+from datetime import datetime, timedelta
+
+from aiohttp import web
+
+SUBJECTS = ["Математика", "Физика", "Программирование", "Базы данных", "Английский язык",
+            "История", "Сети", "Операционные системы", "Экономика", "Физкультура"]
+TEACHERS = ["Иванов И.И.", "Петрова А.С.", "Сидоров П.П.", "Кузнецова Е.В.", "Смирнов Д.А.",
+            "Попова О.Н.", "Волков С.М.", "Морозова Т.Г."]
+
+
+def make_groups(count):
+    prefixes = ["ИСП", "ИБ", "СА", "ЭК", "ПД"]
+    return [f"{prefixes[n % len(prefixes)]}-{101 + n // len(prefixes)}" for n in range(count)]
+
+
+def make_schedule(group_id, day_of_week, lessons=(3, 6)):
+    """
+    Одно и то же расписание для одной и той же (группы, дня)
+    """
+    rng = random.Random(f"{group_id}:{day_of_week}")
+    first = rng.randint(1, 2)
+    return {
+        "group_id": group_id,
+        "day_of_week": day_of_week,
+        "lessons": [
+            {
+                "lesson_num": lesson_num,
+                "subject": rng.choice(SUBJECTS),
+                "teacher": rng.choice(TEACHERS),
+                "classroom": str(rng.randint(100, 450)),
+            }
+            for lesson_num in range(first, first + rng.randint(*lessons))
+        ],
+    }
+
+
+class MockScheduleApi:
+    """
+    latency + случайная добавка до jitter секунд на каждый ответ.
+    p401 / p429 - доля запросов расписания с таким ответом (401 - как будто
+    сервер отозвал токен, 429 - с Retry-After). Группы из missing отвечают
+    404. Токен доступа живёт token_ttl секунд, refresh - refresh_ttl
+    """
+
+    def __init__(self, groups, latency=0.05, jitter=0.05, p401=0.0, p429=0.0,
+                 retry_after=1, missing=(), token_ttl=3600, refresh_ttl=86400, seed=0):
+        self.groups = list(groups)
+        self.latency = latency
+        self.jitter = jitter
+        self.p401 = p401
+        self.p429 = p429
+        self.retry_after = retry_after
+        self.missing = set(missing)
+        self.token_ttl = token_ttl
+        self.refresh_ttl = refresh_ttl
+
+        self._rng = random.Random(seed)
+        self._ids = itertools.count(1)
+        # токен -> когда истекает (loop.time())
+        self._access = {}
+        self._refresh = {}
+
+        # (путь, статус) -> количество
+        self.calls = Counter()
+
+    def make_app(self):
+        app = web.Application()
+        app.router.add_post("/login", self.login)
+        app.router.add_post("/refresh", self.refresh)
+        app.router.add_get("/get-schedule", self.get_schedule)
+        app.router.add_get("/get-groups", self.get_groups)
+        return app
+
+    async def start(self, host="127.0.0.1", port=8090):
+        runner = web.AppRunner(self.make_app(), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        return runner
+
+    def count(self, path, status=None):
+        return sum(n for (p, s), n in self.calls.items() if p == path and (status is None or s == status))
+
+    async def _delay(self):
+        delay = self.latency + self._rng.uniform(0, self.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+
+    def _reply(self, request, status, body=None, headers=None):
+        self.calls[(request.path, status)] += 1
+        if body is None:
+            return web.Response(status=status, headers=headers)
+        return web.json_response(body, status=status, headers=headers)
+
+    def _issue(self):
+        now = asyncio.get_running_loop().time()
+        access = f"access-{next(self._ids)}"
+        refresh = f"refresh-{next(self._ids)}"
+        self._access[access] = now + self.token_ttl
+        self._refresh[refresh] = now + self.refresh_ttl
+        return {
+            "access_token": access,
+            "refresh_token": refresh,
+            "access_token_expires_at": (datetime.now() + timedelta(seconds=self.token_ttl)).isoformat(),
+        }
+
+    def _bearer(self, request, tokens):
+        token = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        expires_at = tokens.get(token)
+        return expires_at is not None and asyncio.get_running_loop().time() < expires_at
+
+    async def login(self, request):
+        await self._delay()
+        data = await request.json()
+        if not data.get("username") or not data.get("password"):
+            return self._reply(request, 401, {"msg": "Неверные учетные данные"})
+        return self._reply(request, 200, self._issue())
+
+    async def refresh(self, request):
+        await self._delay()
+        if not self._bearer(request, self._refresh):
+            return self._reply(request, 401, {"msg": "Refresh token истёк"})
+        return self._reply(request, 200, self._issue())
+
+    async def get_groups(self, request):
+        await self._delay()
+        if not self._bearer(request, self._access):
+            return self._reply(request, 401, {"msg": "Токен истёк"})
+        return self._reply(request, 200, {"data": [{"id": group, "name": group} for group in self.groups]})
+
+    async def get_schedule(self, request):
+        await self._delay()
+        if not self._bearer(request, self._access):
+            return self._reply(request, 401, {"msg": "Токен истёк"})
+        roll = self._rng.random()
+        if roll < self.p429:
+            return self._reply(request, 429, {"msg": "Too Many Requests"},
+                               headers={"Retry-After": str(self.retry_after)})
+        if roll < self.p429 + self.p401:
+            return self._reply(request, 401, {"msg": "Токен отозван"})
+
+        group_id = request.query.get("group_id", "")
+        try:
+            day_of_week = int(request.query.get("day_of_week", ""))
+        except ValueError:
+            return self._reply(request, 400, {"msg": "Неверный день недели"})
+        if group_id not in self.groups or group_id in self.missing:
+            return self._reply(request, 404, {"msg": "Расписание не найдено"})
+        return self._reply(request, 200, {"data": make_schedule(group_id, day_of_week)})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--groups", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--p401", type=float, default=0.0)
+    parser.add_argument("--p429", type=float, default=0.0)
+    parser.add_argument("--token-ttl", type=float, default=3600)
+    args = parser.parse_args()
+
+    api = MockScheduleApi(
+        make_groups(args.groups),
+        latency=args.latency,
+        jitter=args.jitter,
+        p401=args.p401,
+        p429=args.p429,
+        token_ttl=args.token_ttl,
+    )
+    web.run_app(api.make_app(), host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Локальная проверка вебхука: шлём синтетические апдейты в WebhookServer
+с настоящими хендлерами dp и заглушкой Bot API.
+
+Запуск из корня репозитория:
+    python -m benchmarks.webhook_local [--updates 500]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+os.environ.setdefault("USER_STORE", "memory")
+
+from aiohttp import ClientSession, web
+
+import main as bot_main
+from benchmarks.fake_telegram import FakeSession, UpdateFactory
+from webhook import WebhookServer
+
+SECRET = "local-secret"
+
+
+async def run(args):
+    session = FakeSession(latency=args.telegram_latency)
+    bot_main.bot.session = session
+    # Токен API не нужен: проверяем только приём и обработку апдейтов
+    bot_main.token_manager.access_token = "local"
+
+    server = WebhookServer(
+        bot_main.dp,
+        bot_main.bot,
+        secret=SECRET,
+        max_concurrency=args.concurrency,
+        max_pending=args.max_pending,
+    )
+    runner = web.AppRunner(server.make_app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", args.port)
+    await site.start()
+
+    factory = UpdateFactory()
+    url = f"http://127.0.0.1:{args.port}{server.path}"
+    headers = {"X-Telegram-Bot-Api-Secret-Token": SECRET}
+    statuses = {}
+
+    async with ClientSession() as http:
+        async with http.post(url, json=factory.command(1, "/start")) as response:
+            assert response.status == 403, "апдейт без секрета должен отклоняться"
+
+        async def post(update):
+            async with http.post(url, json=update, headers=headers) as response:
+                statuses[response.status] = statuses.get(response.status, 0) + 1
+
+        started = time.perf_counter()
+        updates = []
+        for n in range(args.updates):
+            user_id = 1000 + n % args.users
+            if n % 2:
+                updates.append(factory.command(user_id, "/start"))
+            else:
+                updates.append(factory.callback(user_id, "change_group"))
+        await asyncio.gather(*(post(update) for update in updates))
+        accepted_in = time.perf_counter() - started
+
+        await server.drain()
+        await bot_main.sender.close()
+        elapsed = time.perf_counter() - started
+
+    await runner.cleanup()
+
+    stats = server.stats()
+    print(f"Апдейтов отправлено: {args.updates}, ответы вебхука: {statuses}")
+    print(f"  приём: {accepted_in:.2f}s, обработка целиком: {elapsed:.2f}s")
+    print(f"  обработано {stats['processed']}, ошибок {stats['failed']}, отклонено {stats['rejected']}")
+    print(f"  вызовы Bot API: {dict(session.calls)}")
+
+    assert stats["failed"] == 0, "хендлеры упали"
+    assert stats["processed"] == stats["accepted"], "не все принятые апдейты обработаны"
+    assert statuses.get(200, 0) + statuses.get(503, 0) == args.updates
+    if args.max_pending < args.updates:
+        assert stats["rejected"] > 0, "при переполнении ожидался 503"
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--updates", type=int, default=500)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--max-pending", type=int, default=1000)
+    parser.add_argument("--telegram-latency", type=float, default=0.01)
+    parser.add_argument("--port", type=int, default=8089)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
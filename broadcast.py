@@ -0,0 +1,293 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+from aiogram.exceptions import TelegramForbiddenError
+
+from rate_governor import Priority
+
+logger = logging.getLogger(__name__)
+
+
+class BroadcastStore:
+    """
+    Подписки на вечернюю рассылку и прогресс рассылок в SQLite.
+
+    Группа подписчика берётся из таблицы user_groups той же базы
+    (её ведёт SqliteUserGroupStore), поэтому смена группы сразу
+    учитывается в следующей рассылке.
+
+    shard=(index, count) - воркер видит только своих подписчиков
+    (user_id % count == index), как и SqliteUserGroupStore.
+    """
+
+    def __init__(self, path, shard=None):
+        self.path = path
+        self.shard = shard
+        self._conn = None
+        self._conn_lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(
+                "CREATE TABLE IF NOT EXISTS user_groups ("
+                "user_id INTEGER PRIMARY KEY, group_id TEXT NOT NULL, updated_at REAL NOT NULL);"
+                "CREATE TABLE IF NOT EXISTS subscriptions ("
+                "user_id INTEGER PRIMARY KEY, chat_id INTEGER NOT NULL, created_at REAL NOT NULL);"
+                "CREATE TABLE IF NOT EXISTS broadcast_runs ("
+                "run_id TEXT PRIMARY KEY, day_of_week INTEGER NOT NULL, "
+                "started_at REAL NOT NULL, finished_at REAL, "
+                "last_group TEXT, last_user_id INTEGER NOT NULL DEFAULT 0, "
+                "groups_done INTEGER NOT NULL DEFAULT 0, "
+                "sent INTEGER NOT NULL DEFAULT 0, failed INTEGER NOT NULL DEFAULT 0);"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _execute(self, sql, params=()):
+        with self._conn_lock:
+            conn = self._connect()
+            with conn:
+                return conn.execute(sql, params).fetchall()
+
+    def subscribe(self, user_id, chat_id):
+        self._execute(
+            "INSERT INTO subscriptions (user_id, chat_id, created_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(user_id) DO UPDATE SET chat_id = excluded.chat_id",
+            (user_id, chat_id, time.time()),
+        )
+
+    def unsubscribe(self, user_id):
+        return self._execute("DELETE FROM subscriptions WHERE user_id = ? RETURNING user_id", (user_id,))
+
+    def _shard_filter(self):
+        if self.shard is None:
+            return "", ()
+        index, count = self.shard
+        return " AND s.user_id % ? = ?", (count, index)
+
+    def groups(self, after=None):
+        """
+        Группы, у которых есть подписчики, по порядку (для возобновления)
+        """
+        shard_sql, shard_params = self._shard_filter()
+        rows = self._execute(
+            "SELECT DISTINCT g.group_id FROM subscriptions s "
+            "JOIN user_groups g ON g.user_id = s.user_id "
+            f"WHERE (? IS NULL OR g.group_id > ?){shard_sql} ORDER BY g.group_id",
+            (after, after, *shard_params),
+        )
+        return [row[0] for row in rows]
+
+    def chats(self, group_id, after_user_id, limit):
+        """
+        Следующая пачка (user_id, chat_id) подписчиков группы
+        """
+        shard_sql, shard_params = self._shard_filter()
+        return self._execute(
+            "SELECT s.user_id, s.chat_id FROM subscriptions s "
+            "JOIN user_groups g ON g.user_id = s.user_id "
+            f"WHERE g.group_id = ? AND s.user_id > ?{shard_sql} ORDER BY s.user_id LIMIT ?",
+            (group_id, after_user_id, *shard_params, limit),
+        )
+
+    def get_run(self, run_id):
+        rows = self._execute(
+            "SELECT run_id, day_of_week, started_at, finished_at, last_group, last_user_id, "
+            "groups_done, sent, failed FROM broadcast_runs WHERE run_id = ?",
+            (run_id,),
+        )
+        if not rows:
+            return None
+        keys = ("run_id", "day_of_week", "started_at", "finished_at", "last_group",
+                "last_user_id", "groups_done", "sent", "failed")
+        return dict(zip(keys, rows[0]))
+
+    def start_run(self, run_id, day_of_week):
+        self._execute(
+            "INSERT OR IGNORE INTO broadcast_runs (run_id, day_of_week, started_at) VALUES (?, ?, ?)",
+            (run_id, day_of_week, time.time()),
+        )
+        return self.get_run(run_id)
+
+    def save_progress(self, run_id, group_id, last_user_id, sent, failed, group_done=False):
+        self._execute(
+            "UPDATE broadcast_runs SET last_group = ?, last_user_id = ?, "
+            "sent = sent + ?, failed = failed + ?, groups_done = groups_done + ? WHERE run_id = ?",
+            (group_id, -1 if group_done else last_user_id, sent, failed, int(group_done), run_id),
+        )
+
+    def finish_run(self, run_id):
+        self._execute("UPDATE broadcast_runs SET finished_at = ? WHERE run_id = ?", (time.time(), run_id))
+
+    def close(self):
+        with self._conn_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class BroadcastEngine:
+    """
+    Вечерняя рассылка расписания на завтра.
+
+    Подписчики обходятся по группам: расписание группы запрашивается и
+    рендерится один раз, затем тот же текст уходит всем её чатам пачками
+    по batch_size через общую очередь отправки (она держит лимиты
+    Telegram). Пачки идут с приоритетом BROADCAST, и следующая ставится
+    в очередь, только когда в ней нет ответов пользователям. Прогресс
+    (группа и последний user_id) сохраняется после каждой пачки, так что
+    после падения рассылка продолжается с места остановки, а не
+    начинается заново. У шардированного хранилища у каждого воркера
+    своя рассылка со своим прогрессом.
+    """
+
+    def __init__(self, store, fetch, render, sender, hour=20, minute=0, batch_size=500):
+        self.store = store
+        self.fetch = fetch
+        self.render = render
+        self.sender = sender
+        self.hour = hour
+        self.minute = minute
+        self.batch_size = batch_size
+
+        self._task = None
+        self.current = None
+
+    @staticmethod
+    def target_day(now):
+        """
+        Завтрашний день недели (1-6) или None, если завтра воскресенье
+        """
+        tomorrow = (now + timedelta(days=1)).weekday() + 1
+        return tomorrow if tomorrow <= 6 else None
+
+    async def run(self, run_id, day_of_week):
+        """
+        Рассылка целиком (или её продолжение после падения)
+        """
+        run = await asyncio.to_thread(self.store.start_run, run_id, day_of_week)
+        if run["finished_at"]:
+            return run
+
+        self.current = run
+        logger.info(f"📣 Рассылка {run_id}: начинаем с группы {run['last_group'] or 'первой'}")
+
+        # Недоработанную группу продолжаем, законченную пропускаем
+        resume_group = run["last_group"]
+        if resume_group is not None and run["last_user_id"] != -1:
+            groups = [resume_group] + await asyncio.to_thread(self.store.groups, resume_group)
+        else:
+            groups = await asyncio.to_thread(self.store.groups, resume_group)
+
+        for group_id in groups:
+            after_user_id = run["last_user_id"] if group_id == resume_group and run["last_user_id"] > 0 else 0
+            await self._broadcast_group(run_id, group_id, day_of_week, after_user_id)
+
+        await asyncio.to_thread(self.store.finish_run, run_id)
+        self.current = await asyncio.to_thread(self.store.get_run, run_id)
+        logger.info(
+            f"📣 Рассылка {run_id} завершена: отправлено {self.current['sent']}, "
+            f"ошибок {self.current['failed']}"
+        )
+        return self.current
+
+    async def _broadcast_group(self, run_id, group_id, day_of_week, after_user_id):
+        schedule_data = await self.fetch(group_id, day_of_week)
+        if not schedule_data or (isinstance(schedule_data, dict) and "error" in schedule_data):
+            logger.warning(f"📣 Нет расписания для группы {group_id}, пропускаем")
+            await asyncio.to_thread(
+                self.store.save_progress, run_id, group_id, after_user_id, 0, 0, True
+            )
+            return
+
+        # Один рендер на группу - дальше одна и та же строка для всех чатов
+        parts = self.render(schedule_data, group_id, day_of_week)
+
+        while True:
+            # Ответы пользователям не ждут за пачкой рассылки
+            await self.sender.wait_idle(Priority.BROADCAST)
+            chats = await asyncio.to_thread(self.store.chats, group_id, after_user_id, self.batch_size)
+            if not chats:
+                break
+
+            results = await asyncio.gather(*(self._deliver(user_id, chat_id, parts) for user_id, chat_id in chats))
+            sent = sum(results)
+            after_user_id = chats[-1][0]
+            await asyncio.to_thread(
+                self.store.save_progress, run_id, group_id, after_user_id, sent, len(chats) - sent
+            )
+            self._update_current(sent, len(chats) - sent, group_id)
+
+        await asyncio.to_thread(self.store.save_progress, run_id, group_id, after_user_id, 0, 0, True)
+        if self.current is not None:
+            self.current["groups_done"] += 1
+
+    def _update_current(self, sent, failed, group_id):
+        if self.current is not None:
+            self.current["sent"] += sent
+            self.current["failed"] += failed
+            self.current["last_group"] = group_id
+
+    async def _deliver(self, user_id, chat_id, parts):
+        try:
+            await self.sender.send_parts(chat_id, parts, priority=Priority.BROADCAST)
+            return True
+        except TelegramForbiddenError:
+            # Пользователь заблокировал бота - больше не пишем
+            await asyncio.to_thread(self.store.unsubscribe, user_id)
+        except Exception as e:
+            logger.error(f"🚫 Ошибка рассылки в чат {chat_id}: {e}")
+        return False
+
+    def _next_run_at(self, now):
+        run_at = now.replace(hour=self.hour, minute=self.minute, second=0, microsecond=0)
+        if run_at <= now:
+            run_at += timedelta(days=1)
+        return run_at
+
+    async def _run(self):
+        # Рассылка, прерванная падением, продолжается сразу после старта
+        now = datetime.now()
+        today_run_at = now.replace(hour=self.hour, minute=self.minute, second=0, microsecond=0)
+        if now >= today_run_at:
+            await self._run_for(now)
+
+        while True:
+            run_at = self._next_run_at(datetime.now())
+            await asyncio.sleep((run_at - datetime.now()).total_seconds())
+            await self._run_for(run_at)
+
+    async def _run_for(self, now):
+        day_of_week = self.target_day(now)
+        if day_of_week is None:
+            return
+        run_id = now.date().isoformat()
+        if self.store.shard is not None:
+            index, count = self.store.shard
+            run_id += f"/{index}-{count}"
+        try:
+            await self.run(run_id, day_of_week)
+        except Exception as e:
+            logger.error(f"🚫 Ошибка рассылки: {e}")
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self):
+        return dict(self.current) if self.current else None
@@ -0,0 +1,242 @@
+import asyncio
+import bisect
+import difflib
+import logging
+import re
+import time
+
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+
+logger = logging.getLogger(__name__)
+
+# Латиница, похожая на кириллицу в названиях групп (ISP -> ИСП)
+_TRANSLIT = str.maketrans({
+    "a": "а", "b": "б", "c": "ц", "d": "д", "e": "е", "f": "ф", "g": "г", "h": "х",
+    "i": "и", "k": "к", "l": "л", "m": "м", "n": "н", "o": "о", "p": "п", "r": "р",
+    "s": "с", "t": "т", "u": "у", "v": "в", "y": "ы", "z": "з",
+})
+_TOKEN = re.compile(r"[^\W_]+")
+
+
+def normalize(text):
+    """
+    Ключ для поиска: нижний регистр, латиница -> кириллица, без разделителей
+    """
+    return "".join(_TOKEN.findall(str(text).lower().translate(_TRANSLIT)))
+
+
+def parse_groups(data):
+    """
+    Список групп из ответа API: строки или объекты с id/name
+    """
+    if isinstance(data, dict):
+        data = data.get("data", data.get("groups", []))
+    groups = []
+    for item in data or []:
+        if isinstance(item, dict):
+            group_id = item.get("group_id", item.get("id"))
+            name = item.get("name", item.get("group_name", group_id))
+        else:
+            group_id = name = item
+        if group_id is not None:
+            groups.append((str(group_id), str(name)))
+    return groups
+
+
+class GroupCatalog:
+    """
+    Каталог групп из API с поисковым индексом и готовыми клавиатурами.
+
+    Список периодически перечитывается; при ошибке остаётся прежний.
+    На каждую версию каталога один раз строятся все страницы клавиатуры
+    и отсортированный индекс ключей для поиска по префиксу (bisect).
+    Если по префиксу ничего нет, ищем похожие названия (difflib) -
+    опечатки вроде "ИПС-102".
+    """
+
+    def __init__(self, load, fallback=(), refresh_interval=3600, retry_interval=60,
+                 page_size=10, columns=2):
+        self.load = load
+        self.refresh_interval = refresh_interval
+        self.retry_interval = retry_interval
+        self.page_size = page_size
+        self.columns = columns
+
+        self._task = None
+        self._names = {}
+        self._keys = []
+        self._by_key = {}
+        self._pages = []
+        self._search_cache = {}
+
+        self.version = 0
+        self.refreshes = 0
+        self.failures = 0
+        self.loaded_at = None
+
+        self._rebuild(list(fallback))
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, group_id):
+        return group_id in self._names
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def name(self, group_id):
+        return self._names.get(group_id, group_id)
+
+    async def refresh(self):
+        """
+        Перечитываем список групп; True - каталог актуален
+        """
+        try:
+            groups = await self.load()
+        except Exception as e:
+            groups = None
+            logger.error(f"🚫 Ошибка загрузки списка групп: {e}")
+
+        if not groups:
+            self.failures += 1
+            return False
+
+        self.refreshes += 1
+        self.loaded_at = time.time()
+        if dict(groups) != self._names:
+            self._rebuild(groups)
+            logger.info(f"📚 Каталог групп v{self.version}: {len(self._names)} групп")
+        return True
+
+    def _rebuild(self, groups):
+        names = dict(groups)
+        ordered = sorted(names.items(), key=lambda item: (normalize(item[1]), item[0]))
+
+        keys = []
+        for group_id, name in ordered:
+            for text in {name, group_id}:
+                keys.append((normalize(text), group_id))
+                # Поиск и по части названия: "102" находит "ИСП-102"
+                for token in _TOKEN.findall(text.lower().translate(_TRANSLIT))[1:]:
+                    keys.append((token, group_id))
+        keys.sort()
+
+        buttons = [
+            InlineKeyboardButton(text=name, callback_data=f"group_{group_id}")
+            for group_id, name in ordered
+        ]
+        total = max(1, -(-len(buttons) // self.page_size))
+        pages = [
+            self._markup(buttons[page * self.page_size:(page + 1) * self.page_size], page, total)
+            for page in range(total)
+        ]
+
+        # Подменяем одним присваиванием на поле - читатели не видят полусобранный индекс
+        by_key = {normalize(name): group_id for group_id, name in ordered}
+        self._names, self._keys, self._by_key, self._pages = names, keys, by_key, pages
+        self._search_cache = {}
+        self.version += 1
+
+    def _markup(self, buttons, page, total):
+        rows = [buttons[i:i + self.columns] for i in range(0, len(buttons), self.columns)]
+        if total > 1:
+            nav = []
+            if page > 0:
+                nav.append(InlineKeyboardButton(text="◀️", callback_data=f"groups_page_{page - 1}"))
+            nav.append(InlineKeyboardButton(text=f"{page + 1}/{total}", callback_data="groups_noop"))
+            if page < total - 1:
+                nav.append(InlineKeyboardButton(text="▶️", callback_data=f"groups_page_{page + 1}"))
+            rows.append(nav)
+        return InlineKeyboardMarkup(inline_keyboard=rows)
+
+    @property
+    def pages(self):
+        return len(self._pages)
+
+    def keyboard(self, page=0):
+        """
+        Готовая страница клавиатуры (номер страницы ограничивается)
+        """
+        pages = self._pages
+        return pages[min(max(page, 0), len(pages) - 1)]
+
+    def search(self, query, limit=10):
+        """
+        group_id подходящих групп: сначала по префиксу, иначе похожие
+        """
+        needle = normalize(query)
+        if not needle:
+            return []
+
+        keys = self._keys
+        found = []
+        position = bisect.bisect_left(keys, (needle,))
+        while position < len(keys) and keys[position][0].startswith(needle):
+            group_id = keys[position][1]
+            if group_id not in found:
+                found.append(group_id)
+                if len(found) >= limit:
+                    break
+            position += 1
+
+        if not found:
+            by_key = self._by_key
+            for match in difflib.get_close_matches(needle, by_key, n=limit, cutoff=0.6):
+                found.append(by_key[match])
+
+        found.sort(key=lambda group_id: normalize(self._names[group_id]))
+        return found
+
+    def search_keyboard(self, query, limit=10):
+        """
+        Клавиатура с результатами поиска или None, если ничего не нашли
+        """
+        needle = normalize(query)
+        cached = self._search_cache.get(needle)
+        if cached is not None or needle in self._search_cache:
+            return cached
+
+        found = self.search(query, limit)
+        markup = None
+        if found:
+            buttons = [
+                InlineKeyboardButton(text=self._names[group_id], callback_data=f"group_{group_id}")
+                for group_id in found
+            ]
+            markup = self._markup(buttons, 0, 1)
+
+        if len(self._search_cache) >= 1000:
+            self._search_cache.clear()
+        self._search_cache[needle] = markup
+        return markup
+
+    async def _run(self):
+        # Первую загрузку делает startup, здесь только повторные
+        ok = self.loaded_at is not None
+        while True:
+            await asyncio.sleep(self.refresh_interval if ok else self.retry_interval)
+            ok = await self.refresh()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self):
+        return {
+            "groups": len(self._names),
+            "version": self.version,
+            "pages": len(self._pages),
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "loaded_at": self.loaded_at,
+        }
@@ -0,0 +1,98 @@
+import logging
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+class ApiHttpClient:
+    """
+    Общий HTTP клиент для всех запросов к API расписания.
+
+    Одна долгоживущая aiohttp.ClientSession с пулом keep-alive соединений,
+    ограничением соединений на хост и кешем DNS вместо новой сессии
+    (и нового TCP/TLS рукопожатия) на каждое нажатие кнопки.
+    """
+
+    def __init__(self, base_url, limit=100, limit_per_host=20, dns_ttl=300,
+                 keepalive_timeout=30, timeout=10):
+        self.base_url = base_url.rstrip("/")
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_ttl = dns_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+
+        self._session = None
+        self._connector = None
+        self.requests_total = 0
+        self.sessions_created = 0
+
+    @property
+    def session(self):
+        """
+        Сессия создаётся лениво - ей нужен запущенный event loop
+        """
+        if self._session is None or self._session.closed:
+            self._connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.dns_ttl,
+                use_dns_cache=True,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=self._connector,
+                timeout=self.timeout,
+            )
+            self.sessions_created += 1
+            logger.info(
+                f"🌐 HTTP пул создан: limit={self.limit}, "
+                f"per_host={self.limit_per_host}, dns_ttl={self.dns_ttl}s"
+            )
+        return self._session
+
+    def request(self, method, path, **kwargs):
+        """
+        Запрос к API: возвращает контекстный менеджер ответа aiohttp
+        """
+        self.requests_total += 1
+        return self.session.request(method, f"{self.base_url}{path}", **kwargs)
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    async def close(self):
+        """
+        Закрываем сессию и все соединения пула
+        """
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info("🌐 HTTP пул закрыт")
+        self._session = None
+        self._connector = None
+
+    def stats(self):
+        """
+        Статистика пула соединений для подбора размеров под нагрузкой
+        """
+        connector = self._connector
+        in_use = idle = waiting = 0
+        if connector is not None and not connector.closed:
+            # Внутренние поля TCPConnector - публичного API для этого нет
+            in_use = len(getattr(connector, "_acquired", ()))
+            idle = sum(len(conns) for conns in getattr(connector, "_conns", {}).values())
+            waiting = sum(len(w) for w in getattr(connector, "_waiters", {}).values())
+
+        return {
+            "limit": self.limit,
+            "limit_per_host": self.limit_per_host,
+            "in_use": in_use,
+            "idle": idle,
+            "waiting": waiting,
+            "requests_total": self.requests_total,
+            "sessions_created": self.sessions_created,
+        }
@@ -0,0 +1,99 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+RELATIVE_DAYS = {"сегодня": 0, "завтра": 1, "послезавтра": 2}
+# Принятые сокращения: "пт" и "чт" - не начала названий дней
+DAY_ABBREVIATIONS = {"пн": 1, "вт": 2, "ср": 3, "чт": 4, "пт": 5, "сб": 6}
+
+
+def _day_offset(now, offset):
+    day = (now + timedelta(days=offset)).weekday() + 1
+    return day if day <= 6 else None
+
+
+def parse_inline_query(text, days_mapping, now=None):
+    """
+    "ИСП-102 вторник" -> ("ИСП-102", [2]).
+
+    День - сокращение (пн, вт, ... сб), любое слово, с которого начинается
+    название дня из days_mapping ("втор"), или сегодня/завтра/послезавтра.
+    Всё остальное - запрос группы. Без дня - сегодня и завтра
+    (воскресенье пропускаем)
+    """
+    now = now or datetime.now()
+    group_words = []
+    days = []
+    for word in text.lower().split():
+        day = None
+        if word in RELATIVE_DAYS:
+            day = _day_offset(now, RELATIVE_DAYS[word])
+            if day is None:
+                continue
+        elif word.rstrip(".") in DAY_ABBREVIATIONS:
+            day = DAY_ABBREVIATIONS[word.rstrip(".")]
+        elif len(word) >= 2:
+            day = next((number for name, number in days_mapping.items() if name.startswith(word)), None)
+        if day is None:
+            group_words.append(word)
+        elif day not in days:
+            days.append(day)
+
+    if not days:
+        days = [day for day in (_day_offset(now, 0), _day_offset(now, 1)) if day is not None]
+        if not days:
+            days = [1]
+    return " ".join(group_words), days
+
+
+class LatestPerUser:
+    """
+    Для каждого пользователя живёт только последний запрос.
+
+    Telegram шлёт inline-запрос на каждое нажатие клавиши. Новый запрос
+    отменяет предыдущий, который ещё ждёт паузы в delay секунд или уже
+    ждёт API. run() возвращает результат или None, если запрос вытеснен
+    """
+
+    def __init__(self, delay=0.4):
+        self.delay = delay
+        self._tasks = {}
+
+        self.started = 0
+        self.superseded = 0
+
+    async def run(self, user_id, fn, debounce=True):
+        previous = self._tasks.get(user_id)
+        if previous is not None and not previous.done():
+            previous.cancel()
+            self.superseded += 1
+
+        self.started += 1
+        task = asyncio.create_task(self._call(fn, debounce))
+        self._tasks[user_id] = task
+        try:
+            await asyncio.wait({task})
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        finally:
+            if self._tasks.get(user_id) is task:
+                del self._tasks[user_id]
+
+        if task.cancelled():
+            return None
+        return task.result()
+
+    async def _call(self, fn, debounce):
+        if debounce and self.delay:
+            await asyncio.sleep(self.delay)
+        return await fn()
+
+    def stats(self):
+        return {
+            "in_flight": len(self._tasks),
+            "started": self.started,
+            "superseded": self.superseded,
+        }
@@ -0,0 +1,139 @@
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+from datetime import datetime
+
+from metrics import TraceIdFilter
+
+
+def truncate(text, limit=500):
+    """
+    Обрезаем тело ответа API и прочие длинные куски для лога
+    """
+    text = str(text)
+    if limit and len(text) > limit:
+        return f"{text[:limit]}… (+{len(text) - limit} симв.)"
+    return text
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Одна запись - одна строка JSON: ts, level, logger, trace_id, msg
+    """
+
+    def __init__(self, max_length=4000):
+        super().__init__()
+        self.max_length = max_length
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "trace_id": getattr(record, "trace_id", "-"),
+            "msg": truncate(record.getMessage(), self.max_length),
+        }
+        if getattr(record, "sampled_out", 0):
+            entry["sampled_out"] = record.sampled_out
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Ограничение частоты для записей уровня level и ниже.
+
+    У каждого места вызова (файл, строка) своё ведро на burst записей,
+    пополняемое со скоростью rate в секунду; лишнее отбрасываем. Первая
+    пропущенная после отбрасывания запись несёт sampled_out - сколько
+    строк с этого места выкинуто. Предупреждения и ошибки не трогаем
+    """
+
+    def __init__(self, rate=10.0, burst=50, level=logging.INFO):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.level = level
+        # (файл, строка) -> [токены, когда пополняли, отброшено подряд]
+        self._sites = {}
+
+        self.dropped = 0
+
+    def filter(self, record):
+        if record.levelno > self.level or not self.rate:
+            return True
+
+        now = time.monotonic()
+        key = (record.pathname, record.lineno)
+        site = self._sites.get(key)
+        if site is None:
+            site = self._sites[key] = [self.burst, now, 0]
+        else:
+            site[0] = min(self.burst, site[0] + (now - site[1]) * self.rate)
+            site[1] = now
+
+        if site[0] < 1:
+            site[2] += 1
+            self.dropped += 1
+            return False
+        site[0] -= 1
+        if site[2]:
+            record.sampled_out = site[2]
+            site[2] = 0
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Сообщение и трейсбек собираем сразу: аргументы могут измениться,
+        # а кадры стека не должны жить до записи в другом потоке
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def create_queue_handler(target, sample_rate=10.0, sample_burst=50):
+    """
+    QueueHandler для event loop и QueueListener, который в отдельном потоке
+    пишет в target. В потоке loop остаются только фильтры и put в очередь
+    """
+    log_queue = queue.SimpleQueue()
+    handler = _QueueHandler(log_queue)
+    # trace id берём в потоке loop - в потоке слушателя контекста апдейта нет
+    handler.addFilter(TraceIdFilter())
+    handler.addFilter(SamplingFilter(sample_rate, sample_burst))
+    listener = logging.handlers.QueueListener(log_queue, target, respect_handler_level=True)
+    return handler, listener
+
+
+def setup_logging(level=logging.INFO, json_format=True, sample_rate=10.0, sample_burst=50, max_length=4000):
+    """
+    Корневой логгер пишет через очередь; слушатель останавливается при
+    выходе из процесса и дописывает остаток очереди
+    """
+    target = logging.StreamHandler(sys.stderr)
+    if json_format:
+        target.setFormatter(JsonFormatter(max_length))
+    else:
+        target.setFormatter(logging.Formatter("%(asctime)s %(levelname)s:%(name)s:[%(trace_id)s] %(message)s"))
+
+    handler, listener = create_queue_handler(target, sample_rate, sample_burst)
+    root = logging.getLogger()
+    for old in list(root.handlers):
+        root.removeHandler(old)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -1,17 +1,52 @@
 import asyncio
 import logging
 import os
-import aiohttp
+import signal
 import json
+import aiohttp
 from dotenv import load_dotenv
 from aiogram import Bot, Dispatcher, types, F
-from aiogram.filters import Command
-from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-from datetime import datetime, timedelta
+from aiogram.filters import Command, CommandObject
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, InlineQueryResultArticle, InlineQueryResultsButton, InputTextMessageContent
+from datetime import datetime
+from http_client import ApiHttpClient
+from schedule_cache import ScheduleCache
+from singleflight import SingleFlight
+from token_manager import TokenManager
+from prewarm import CachePrewarmer
+from user_store import create_user_store
+from telegram_sender import MessageDispatcher
+from webhook import WebhookServer
+from workers import WorkerPool, consume_updates, poll_updates
+from shared_state import create_shared_backend
+from rate_governor import Priority, RateGovernor, RateLimitExceeded, parse_retry_after
+from broadcast import BroadcastEngine, BroadcastStore
+from renderer import ScheduleRenderer, split_text
+from group_catalog import GroupCatalog, parse_groups
+from schedule_index import ScheduleCrawler, ScheduleIndex, current_lesson, parse_slots
+from inline_lookup import LatestPerUser, parse_inline_query
+from snapshot import ScheduleSnapshot
+from resilience import CircuitBreaker, CircuitOpen, Hedger, RetryPolicy, UpstreamError
+from metrics import LATENCY_BUCKETS, HandlerTimingMiddleware, MetricsRegistry, TelegramTimingMiddleware, TraceMiddleware
+from log_pipeline import setup_logging, truncate
 
 load_dotenv()
 
-logging.basicConfig(level=logging.INFO)
+# Логи пишет отдельный поток через очередь: JSON (LOG_FORMAT=text - строками)
+# с trace id апдейта. INFO-строки с одного места - не чаще LOG_SAMPLE_RATE
+# в секунду, тела ответов API обрезаются до LOG_BODY_LIMIT символов
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "10"))
+LOG_SAMPLE_BURST = int(os.getenv("LOG_SAMPLE_BURST", "50"))
+LOG_BODY_LIMIT = int(os.getenv("LOG_BODY_LIMIT", "500"))
+
+setup_logging(
+    level=LOG_LEVEL,
+    json_format=LOG_FORMAT == "json",
+    sample_rate=LOG_SAMPLE_RATE,
+    sample_burst=LOG_SAMPLE_BURST,
+)
 logger = logging.getLogger(__name__)
 
 # Конфигурация
@@ -20,13 +55,235 @@ API_BASE_URL = os.getenv("API_BASE_URL", "https://resp-spbkeit.ru")
 API_USERNAME = os.getenv("API_USERNAME")  # username для JSON API
 API_PASSWORD = os.getenv("API_PASSWORD")  # пароль для JSON API
 
+# Режим работы: polling или webhook
+RUN_MODE = os.getenv("RUN_MODE", "polling")
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")  # публичный адрес, например https://bot.example.com
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+WEBHOOK_MAX_CONCURRENCY = int(os.getenv("WEBHOOK_MAX_CONCURRENCY", "100"))
+WEBHOOK_MAX_PENDING = int(os.getenv("WEBHOOK_MAX_PENDING", "1000"))
+WEBHOOK_DRAIN_TIMEOUT = float(os.getenv("WEBHOOK_DRAIN_TIMEOUT", "30"))
+
+# Несколько процессов-воркеров за одним слушателем (1 - без воркеров)
+WORKERS = int(os.getenv("WORKERS", "1"))
+WORKER_QUEUE_SIZE = int(os.getenv("WORKER_QUEUE_SIZE", "1000"))
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "100"))
+# Общие для воркеров кеш и токены: sqlite или none
+SHARED_BACKEND = os.getenv("SHARED_BACKEND", "sqlite" if WORKERS > 1 else "none")
+SHARED_DB_PATH = os.getenv("SHARED_DB_PATH", os.getenv("USER_DB_PATH", "ebot.db"))
+
+# Пул HTTP соединений к API
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", "100"))
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "20"))
+HTTP_DNS_TTL = int(os.getenv("HTTP_DNS_TTL", "300"))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "30"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+
+# Ограничение скорости запросов к API
+API_RATE_LIMIT = float(os.getenv("API_RATE_LIMIT", "10"))
+API_RATE_BURST = int(os.getenv("API_RATE_BURST", "10"))
+API_RATE_MAX_QUEUE = int(os.getenv("API_RATE_MAX_QUEUE", "10000"))
+# Сколько секунд запрос может ждать очереди к API (по приоритетам)
+API_DEADLINES = {
+    Priority.INTERACTIVE: float(os.getenv("API_DEADLINE_INTERACTIVE", "8")),
+    Priority.PREFETCH: float(os.getenv("API_DEADLINE_PREFETCH", "60")),
+    Priority.BROADCAST: float(os.getenv("API_DEADLINE_BROADCAST", "600")),
+}
+
+# Устойчивость к сбоям API: таймаут одной попытки, повторы, предохранитель
+API_ATTEMPT_TIMEOUT = float(os.getenv("API_ATTEMPT_TIMEOUT", "4"))
+API_RETRY_ATTEMPTS = int(os.getenv("API_RETRY_ATTEMPTS", "2"))
+API_RETRY_BASE_DELAY = float(os.getenv("API_RETRY_BASE_DELAY", "0.3"))
+API_RETRY_MAX_DELAY = float(os.getenv("API_RETRY_MAX_DELAY", "2"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "30"))
+BREAKER_HALF_OPEN_MAX = int(os.getenv("BREAKER_HALF_OPEN_MAX", "1"))
+# Подстраховочный второй запрос, если первый дольше HEDGE_PERCENTILE-го процентиля
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "1") == "1"
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "0.3"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+
+# Лимиты Telegram на исходящие сообщения
+TG_GLOBAL_RATE = float(os.getenv("TG_GLOBAL_RATE", "30"))
+TG_PER_CHAT_INTERVAL = float(os.getenv("TG_PER_CHAT_INTERVAL", "1"))
+TG_MAX_PENDING = int(os.getenv("TG_MAX_PENDING", "10000"))
+
+# Прогрев кеша перед звонками
+PREWARM_ENABLED = os.getenv("PREWARM_ENABLED", "1") == "1"
+PREWARM_LEAD_TIME = int(os.getenv("PREWARM_LEAD_TIME", "120"))
+PREWARM_MAX_GROUPS = int(os.getenv("PREWARM_MAX_GROUPS", "20"))
+PREWARM_RATE = float(os.getenv("PREWARM_RATE", "5"))
+PREWARM_BUDGET = int(os.getenv("PREWARM_BUDGET", "200"))
+
+# Хранилище выбранных групп: sqlite или memory
+USER_STORE = os.getenv("USER_STORE", "sqlite")
+USER_DB_PATH = os.getenv("USER_DB_PATH", "ebot.db")
+USER_STORE_FLUSH_INTERVAL = float(os.getenv("USER_STORE_FLUSH_INTERVAL", "1"))
+
+# Вечерняя рассылка расписания на завтра (подписчики берутся из USER_DB_PATH)
+BROADCAST_ENABLED = os.getenv("BROADCAST_ENABLED", "1") == "1"
+BROADCAST_HOUR = int(os.getenv("BROADCAST_HOUR", "20"))
+BROADCAST_MINUTE = int(os.getenv("BROADCAST_MINUTE", "0"))
+BROADCAST_BATCH_SIZE = int(os.getenv("BROADCAST_BATCH_SIZE", "500"))
+# Рассылка идёт только по SQLite-хранилищу пользователей
+BROADCAST_AVAILABLE = BROADCAST_ENABLED and USER_STORE == "sqlite"
+
+# Каталог групп: откуда брать список и как часто перечитывать
+GROUPS_ENDPOINT = os.getenv("GROUPS_ENDPOINT", "/get-groups")
+GROUPS_REFRESH_INTERVAL = int(os.getenv("GROUPS_REFRESH_INTERVAL", "3600"))
+GROUPS_PAGE_SIZE = int(os.getenv("GROUPS_PAGE_SIZE", "10"))
+
+# Обход расписаний всех групп для поиска преподавателей и аудиторий
+CRAWL_ENABLED = os.getenv("CRAWL_ENABLED", "1") == "1"
+CRAWL_RATE = float(os.getenv("CRAWL_RATE", "2"))
+CRAWL_INTERVAL = int(os.getenv("CRAWL_INTERVAL", "21600"))
+CRAWL_SHARED_INTERVAL = int(os.getenv("CRAWL_SHARED_INTERVAL", "600"))
+
+# Inline-режим: пауза между нажатиями, ожидание API и кеш ответов у Telegram
+INLINE_DEBOUNCE = float(os.getenv("INLINE_DEBOUNCE", "0.4"))
+INLINE_FETCH_TIMEOUT = float(os.getenv("INLINE_FETCH_TIMEOUT", "5"))
+INLINE_CACHE_TIME = int(os.getenv("INLINE_CACHE_TIME", "300"))
+INLINE_ERROR_CACHE_TIME = int(os.getenv("INLINE_ERROR_CACHE_TIME", "5"))
+
+# Снимок удачных ответов API на диске: прогрев после рестарта и запасной
+# ответ, если API упал или интерактивный запрос ждёт дольше SNAPSHOT_SERVE_AFTER
+SNAPSHOT_ENABLED = os.getenv("SNAPSHOT_ENABLED", "1") == "1"
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", USER_DB_PATH)
+SNAPSHOT_MAX_ENTRIES = int(os.getenv("SNAPSHOT_MAX_ENTRIES", "20000"))
+SNAPSHOT_MAX_AGE = int(os.getenv("SNAPSHOT_MAX_AGE", str(14 * 86400)))
+SNAPSHOT_FLUSH_INTERVAL = float(os.getenv("SNAPSHOT_FLUSH_INTERVAL", "30"))
+SNAPSHOT_SERVE_AFTER = float(os.getenv("SNAPSHOT_SERVE_AFTER", "3"))
+
+# Кеш готовых сообщений с расписанием
+RENDER_CACHE_SIZE = int(os.getenv("RENDER_CACHE_SIZE", "2000"))
+
+# Сколько дней недели запрашиваем у API одновременно
+WEEK_FETCH_CONCURRENCY = int(os.getenv("WEEK_FETCH_CONCURRENCY", "3"))
+
+# Фоновое обновление JWT токена
+TOKEN_REFRESH_MARGIN = int(os.getenv("TOKEN_REFRESH_MARGIN", "300"))
+TOKEN_RETRY_ATTEMPTS = int(os.getenv("TOKEN_RETRY_ATTEMPTS", "3"))
+
+# Кеш расписаний
+CACHE_MAX_SIZE = int(os.getenv("CACHE_MAX_SIZE", "5000"))
+CACHE_TTL = int(os.getenv("CACHE_TTL", "3600"))
+CACHE_STALE_TTL = int(os.getenv("CACHE_STALE_TTL", "86400"))
+CACHE_NOT_FOUND_TTL = int(os.getenv("CACHE_NOT_FOUND_TTL", "600"))
+CACHE_RATE_LIMIT_TTL = int(os.getenv("CACHE_RATE_LIMIT_TTL", "10"))
+
+# Метрики: /metrics в формате Prometheus (0 - не поднимать сервер).
+# Воркер N слушает METRICS_PORT + N
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+SLOW_UPDATE_SECONDS = float(os.getenv("SLOW_UPDATE_SECONDS", "2"))
+# Кому /status показывает всё (user_id через запятую; пусто - никому)
+ADMIN_IDS = {int(user_id) for user_id in os.getenv("ADMIN_IDS", "").split(",") if user_id.strip()}
+
 bot = Bot(token=BOT_TOKEN)
 dp = Dispatcher()
 
-# Глобальные переменные для токенов
-access_token = None
-refresh_token = None
-token_expires_at = None
+metrics = MetricsRegistry()
+update_latency = metrics.histogram("update_seconds", "Время обработки апдейта", ("type",))
+handler_latency = metrics.histogram("handler_seconds", "Время работы хендлера", ("handler", "outcome"))
+upstream_latency = metrics.histogram("upstream_seconds", "Время запроса к API расписания", ("endpoint", "status"))
+telegram_latency = metrics.histogram("telegram_request_seconds", "Время запроса к Bot API", ("method", "outcome"))
+outbox_latency = metrics.histogram("telegram_outbox_seconds", "Задержка сообщения от очереди до доставки")
+api_queue_wait = metrics.histogram("api_queue_wait_seconds", "Ожидание разрешения на запрос к API", ("priority",))
+
+dp.update.outer_middleware(TraceMiddleware(update_latency, slow_seconds=SLOW_UPDATE_SECONDS))
+for observer in (dp.message, dp.callback_query, dp.inline_query):
+    observer.middleware(HandlerTimingMiddleware(handler_latency))
+bot.session.middleware(TelegramTimingMiddleware(telegram_latency))
+# Сервер /metrics, если поднят (см. startup)
+metrics_runner = None
+
+webhook_server = WebhookServer(
+    dp,
+    bot,
+    path=WEBHOOK_PATH,
+    secret=WEBHOOK_SECRET,
+    max_concurrency=WEBHOOK_MAX_CONCURRENCY,
+    max_pending=WEBHOOK_MAX_PENDING,
+)
+
+# Все исходящие сообщения идут через общую очередь с лимитами Telegram
+# Общие лимиты делим между воркерами поровну
+sender = MessageDispatcher(
+    bot,
+    global_rate=TG_GLOBAL_RATE / WORKERS,
+    per_chat_interval=TG_PER_CHAT_INTERVAL,
+    max_pending=TG_MAX_PENDING,
+    on_sent=outbox_latency.observe,
+)
+
+shared_backend = create_shared_backend(SHARED_BACKEND, SHARED_DB_PATH)
+
+# Один общий клиент на весь процесс
+api_client = ApiHttpClient(
+    API_BASE_URL,
+    limit=HTTP_POOL_LIMIT,
+    limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+    dns_ttl=HTTP_DNS_TTL,
+    keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+    timeout=HTTP_TIMEOUT,
+)
+
+rate_governor = RateGovernor(
+    rate=API_RATE_LIMIT / WORKERS,
+    burst=API_RATE_BURST,
+    max_queue=API_RATE_MAX_QUEUE,
+    on_wait=api_queue_wait.observe,
+)
+
+api_breaker = CircuitBreaker(
+    "get-schedule",
+    failure_threshold=BREAKER_FAILURE_THRESHOLD,
+    open_seconds=BREAKER_OPEN_SECONDS,
+    half_open_max=BREAKER_HALF_OPEN_MAX,
+)
+api_retry = RetryPolicy(
+    attempts=API_RETRY_ATTEMPTS,
+    base_delay=API_RETRY_BASE_DELAY,
+    max_delay=API_RETRY_MAX_DELAY,
+)
+api_hedger = Hedger(
+    percentile=HEDGE_PERCENTILE,
+    min_delay=HEDGE_MIN_DELAY,
+    min_samples=HEDGE_MIN_SAMPLES,
+)
+
+token_manager = TokenManager(
+    api_client,
+    API_USERNAME,
+    API_PASSWORD,
+    refresh_margin=TOKEN_REFRESH_MARGIN,
+    retry_attempts=TOKEN_RETRY_ATTEMPTS,
+    governor=rate_governor,
+    shared=shared_backend,
+    on_response=upstream_latency.observe,
+)
+
+schedule_cache = ScheduleCache(
+    maxsize=CACHE_MAX_SIZE,
+    ttl=CACHE_TTL,
+    stale_ttl=CACHE_STALE_TTL,
+    not_found_ttl=CACHE_NOT_FOUND_TTL,
+    rate_limit_ttl=CACHE_RATE_LIMIT_TTL,
+    shared=shared_backend,
+)
+
+# Одинаковые запросы расписания "в полёте" склеиваем в один
+schedule_flight = SingleFlight()
+
+snapshot = ScheduleSnapshot(
+    SNAPSHOT_PATH,
+    max_entries=SNAPSHOT_MAX_ENTRIES,
+    max_age=SNAPSHOT_MAX_AGE,
+    flush_interval=SNAPSHOT_FLUSH_INTERVAL,
+) if SNAPSHOT_ENABLED else None
 
 # Соответствие дней недели
 DAYS_MAPPING = {
@@ -58,207 +315,364 @@ LESSON_TIMES = {
     8: "20:40-22:10"
 }
 
+renderer = ScheduleRenderer(LESSON_TIMES, DAYS_NAMES, maxsize=RENDER_CACHE_SIZE)
+
+# Пока API не ответил - группы, которые раньше были зашиты в клавиатуре
+group_catalog = GroupCatalog(
+    lambda: fetch_groups(),
+    fallback=[("31", "31"), ("ISP-102", "ИСП-102"), ("PROG-201", "ПРОГ-201"), ("PROG-202", "ПРОГ-202")],
+    refresh_interval=GROUPS_REFRESH_INTERVAL,
+    page_size=GROUPS_PAGE_SIZE,
+)
+LESSON_SLOTS = parse_slots(LESSON_TIMES)
+
+schedule_index = ScheduleIndex()
+
+crawler = ScheduleCrawler(
+    schedule_index,
+    lambda: group_catalog,
+    lambda group_id, day_of_week: crawl_schedule(group_id, day_of_week),
+    days=list(DAYS_NAMES),
+    rate=CRAWL_RATE,
+    interval=CRAWL_INTERVAL,
+)
+
+inline_lookups = LatestPerUser(delay=INLINE_DEBOUNCE)
 
 # Храним выбранные группы пользователей
-user_groups = {}
+user_groups = create_user_store(
+    USER_STORE,
+    USER_DB_PATH,
+    flush_interval=USER_STORE_FLUSH_INTERVAL,
+)
+
+prewarmer = CachePrewarmer(
+    schedule_cache,
+    lambda group_id, day_of_week: load_schedule(group_id, day_of_week, Priority.PREFETCH),
+    LESSON_TIMES,
+    lead_time=PREWARM_LEAD_TIME,
+    max_groups=PREWARM_MAX_GROUPS,
+    rate=PREWARM_RATE,
+    budget=PREWARM_BUDGET,
+)
+
+subscriptions = BroadcastStore(USER_DB_PATH)
+
+broadcaster = BroadcastEngine(
+    subscriptions,
+    lambda group_id, day_of_week: get_schedule(group_id, day_of_week, Priority.BROADCAST),
+    lambda schedule_data, group_id, day_of_week: renderer.render_parts(
+        schedule_data, group_id, day_of_week, "завтра"
+    ),
+    sender,
+    hour=BROADCAST_HOUR,
+    minute=BROADCAST_MINUTE,
+    batch_size=BROADCAST_BATCH_SIZE,
+)
 
-# Функция для получения JWT токена
-async def get_jwt_token():
+# Счётчики, которые компоненты уже ведут сами, читаем при каждом запросе /metrics
+metrics.collect(
+    "token_events_total", "Входы и обновления токена API",
+    lambda: {event: token_manager.stats()[event] for event in ("logins", "refreshes", "failures", "adopted")},
+    kind="counter", label="event",
+)
+metrics.collect("token_valid", "Токен API действителен", lambda: int(token_manager.is_valid))
+metrics.collect(
+    "cache_lookups_total", "Обращения к кешу расписаний",
+    lambda: {event: schedule_cache.stats()[event] for event in ("hits", "stale_hits", "negative_hits", "misses")},
+    kind="counter", label="result",
+)
+metrics.collect("cache_hit_ratio", "Доля обращений к кешу без похода в API", lambda: schedule_cache.stats()["hit_ratio"])
+metrics.collect("cache_entries", "Записей в кеше расписаний", lambda: schedule_cache.stats()["size"])
+metrics.collect("render_cache_hit_ratio", "Доля готовых ответов из кеша рендера", lambda: renderer.stats()["hit_ratio"])
+metrics.collect(
+    "breaker_open", "Предохранитель API разомкнут (1 - open, 0.5 - half-open)",
+    lambda: {"open": 1, "half_open": 0.5}.get(api_breaker.state, 0),
+)
+metrics.collect("api_retries_total", "Повторы запросов к API", lambda: api_retry.retries, kind="counter")
+metrics.collect("api_rate", "Текущий лимит запросов к API в секунду", lambda: rate_governor.stats()["rate"])
+metrics.collect("api_queue_depth", "Запросов ждут лимита API", lambda: rate_governor.stats()["queue_depth"])
+metrics.collect(
+    "telegram_messages_total", "Исходящие сообщения",
+    lambda: {event: sender.stats()[event] for event in ("sent", "failed", "retry_after")},
+    kind="counter", label="result",
+)
+metrics.collect("telegram_queue_depth", "Сообщений в очереди на отправку", lambda: sender.stats()["queue_depth"])
+metrics.collect("users", "Пользователей с выбранной группой", lambda: user_groups.stats()["users"])
+
+# Функция для получения расписания
+async def get_schedule(group_id, day_of_week, priority=Priority.INTERACTIVE):
     """
-    Получаем JWT токен через JSON API /login
+    Получаем расписание из кеша, при промахе - из API.
+    Устаревшую запись отдаём сразу и обновляем в фоне
     """
-    global access_token, refresh_token, token_expires_at
-    
-    try:
-        auth_data = {
-            "username": API_USERNAME,
-            "password": API_PASSWORD
-        }
-        logger.info("🔐 Получаем JWT токен...")
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                f"{API_BASE_URL}/login",  # JSON API endpoint
-                json=auth_data,
-                headers={"Content-Type": "application/json"},
-                timeout=aiohttp.ClientTimeout(total=10)
-            ) as response:
-                
-                logger.info(f"📡 Статус аутентификации: {response.status}")
-                
-                if response.status == 200:
-                    data = await response.json()
-                    
-                    access_token = data["access_token"]
-                    refresh_token = data["refresh_token"]
-                    token_expires_at = datetime.fromisoformat(data["access_token_expires_at"])
-                    
-                    logger.info("✅ JWT токен успешно получен!")
-                    return True
-                    
-                elif response.status == 400:
-                    error_data = await response.json()
-                    logger.error(f"❌ Ошибка 400: {error_data.get('msg', 'Неверный формат данных')}")
-                    return False
-                    
-                elif response.status == 401:
-                    error_data = await response.json()
-                    logger.error(f"❌ Ошибка 401: {error_data.get('msg', 'Неверные учетные данные')}")
-                    return False
-                    
-                else:
-                    logger.error(f"❌ Ошибка {response.status}")
-                    return False
-                    
-    except Exception as e:
-        logger.error(f"🚫 Ошибка при получении токена: {e}")
-        return False
+    prewarmer.record(group_id)
+    key = schedule_cache.make_key(group_id, day_of_week)
+    cached, fresh = schedule_cache.get(key)
+    if cached is None and schedule_cache.shared is not None:
+        cached, fresh = await schedule_cache.get_shared(key)
+
+    if cached is not None:
+        if not fresh:
+            schedule_cache.refresh_in_background(
+                key, lambda: load_schedule(group_id, day_of_week, Priority.PREFETCH)
+            )
+        return cached
+
+    if snapshot is None:
+        return await load_schedule(group_id, day_of_week, priority)
+
+    # Загрузка не отменяется, даже если мы ответим копией: она обновит кеш
+    loading = asyncio.ensure_future(load_schedule(group_id, day_of_week, priority))
+    loading.add_done_callback(lambda task: task.cancelled() or task.exception())
+    wait = SNAPSHOT_SERVE_AFTER if priority == Priority.INTERACTIVE else None
+    done, _ = await asyncio.wait({loading}, timeout=wait)
+    result = loading.result() if done else None
 
-# Функция для обновления токена
-async def refresh_jwt_token():
+    # API не ответил или упёрлись в лимит - отдаём последнюю удачную версию
+    if result is None or (schedule_cache.is_error(result) and result["error"] == "rate_limit"):
+        saved = await snapshot.get(key)
+        if saved is not None:
+            value, fetched_at = saved
+            logger.warning(f"💾 Отдаём сохранённое расписание {group_id}, день {day_of_week}")
+            return dict(value, snapshot_at=fetched_at)
+        if not done:
+            return await asyncio.shield(loading)
+    return result
+
+# Функция для получения расписания на всю неделю
+async def get_week_schedule(group_id):
     """
-    Обновляем JWT токен используя refresh token
+    Получаем расписание на все дни недели параллельно (не больше
+    WEEK_FETCH_CONCURRENCY запросов к API за раз). Каждый день попадает
+    в кеш, так что последующие нажатия на отдельные дни бесплатны
     """
-    global access_token, refresh_token, token_expires_at
-    
-    try:
-        headers = {
-            "Authorization": f"Bearer {refresh_token}",
-            "Content-Type": "application/json"
-        }
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                f"{API_BASE_URL}/refresh",
-                headers=headers,
-                timeout=aiohttp.ClientTimeout(total=10)
-            ) as response:
-                
-                if response.status == 200:
-                    data = await response.json()
-                    
-                    access_token = data["access_token"]
-                    refresh_token = data["refresh_token"]
-                    token_expires_at = datetime.fromisoformat(data["access_token_expires_at"])
-                    
-                    logger.info("🔄 Токен успешно обновлен!")
-                    return True
-                else:
-                    logger.error(f"❌ Ошибка обновления токена: {response.status}")
-                    return False
-                    
-    except Exception as e:
-        logger.error(f"🚫 Ошибка обновления токена: {e}")
-        return False
+    semaphore = asyncio.Semaphore(WEEK_FETCH_CONCURRENCY)
+
+    async def _day(day_number):
+        async with semaphore:
+            return await get_schedule(group_id, day_number)
+
+    results = await asyncio.gather(*(_day(day_number) for day_number in DAYS_NAMES))
+    return dict(zip(DAYS_NAMES, results))
 
-# Функция для проверки валидности токена
-async def ensure_valid_token():
+# Расписание для обхода: из кеша, если свежее, иначе из API
+async def crawl_schedule(group_id, day_of_week, upstream=True):
     """
-    Проверяем что токен валиден и при необходимости обновляем
+    upstream=False - только кеш (в т.ч. общий): так обходят воркеры,
+    которым расписание уже загрузил воркер 0
     """
-    global access_token, token_expires_at
+    key = schedule_cache.make_key(group_id, day_of_week)
+    cached, fresh = schedule_cache.peek(key)
+    if cached is None and schedule_cache.shared is not None:
+        cached, fresh = await schedule_cache.get_shared(key)
     
-    if not access_token:
-        return await get_jwt_token()
-    
-    # Проверяем истечение токена (с запасом 5 минут)
-    if token_expires_at and datetime.now() > token_expires_at - timedelta(minutes=5):
-        logger.info("🔄 Токен скоро истекает, обновляем...")
-        return await refresh_jwt_token()
-    
-    return True
+    if fresh or not upstream:
+        return cached
+    return await load_schedule(group_id, day_of_week, Priority.PREFETCH)
 
-# Функция для получения расписания
-async def get_schedule(group_id, day_of_week):
+# Функция для загрузки расписания в кеш
+async def load_schedule(group_id, day_of_week, priority=Priority.INTERACTIVE):
     """
-    Получаем расписание через API /api/get-schedule
+    Запрашиваем расписание у API и кладём в кеш.
+    Одновременные запросы одной группы и дня идут одним запросом к API
+    """
+    key = schedule_cache.make_key(group_id, day_of_week)
+
+    async def _load():
+        schedule_data = await fetch_schedule(group_id, day_of_week, priority)
+        schedule_cache.set(key, schedule_data)
+        if schedule_data is not None:
+            schedule_index.update(group_id, day_of_week, schedule_data)
+            if snapshot is not None and not schedule_cache.is_error(schedule_data):
+                snapshot.record(key, schedule_data)
+        return schedule_data
+
+    return await schedule_flight.do(key, _load)
+
+# Функция для запроса расписания у API
+async def fetch_schedule(group_id, day_of_week, priority=Priority.INTERACTIVE):
+    """
+    Получаем расписание через API /api/get-schedule.
+    Каждая попытка ждёт разрешения RateGovernor (до запуска таймера
+    подстраховки, у подстраховки своё разрешение) и длится не дольше
+    API_ATTEMPT_TIMEOUT. На 429 ждём и повторяем, пока не выйдет дедлайн
+    очереди; сетевые ошибки и 5xx повторяем не больше API_RETRY_ATTEMPTS
+    раз; на 401 обновляем токен один раз. Всё это за предохранителем
+    api_breaker, интерактивные запросы подстраховываются api_hedger
     """
     # Убеждаемся что токен валиден
-    if not await ensure_valid_token():
+    if not await token_manager.ensure():
         return None
     
-    try:
-        params = {
-            "group_id": group_id,
-            "day_of_week": day_of_week
-        }
-        
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + API_DEADLINES[priority]
+    params = {
+        "group_id": group_id,
+        "day_of_week": day_of_week
+    }
+    
+    async def _attempt(permit):
         headers = {
-            "Authorization": f"Bearer {access_token}",
+            "Authorization": f"Bearer {token_manager.access_token}",
             "Content-Type": "application/json"
         }
-        
-        logger.info(f"📅 Запрашиваем расписание: группа {group_id}, день {day_of_week}")
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                f"{API_BASE_URL}/get-schedule",
+        timeout = max(0.1, min(API_ATTEMPT_TIMEOUT, deadline - loop.time()))
+        started = loop.time()
+        status = "error"
+        try:
+            async with api_client.get(
+                "/get-schedule",
                 params=params,
                 headers=headers,
-                timeout=aiohttp.ClientTimeout(total=10)
+                timeout=aiohttp.ClientTimeout(total=timeout)
             ) as response:
-                
+                status = response.status
                 logger.info(f"📡 Статус получения расписания: {response.status}")
-                
+                if response.status >= 500:
+                    # Страница ошибки может быть большой - читаем только начало
+                    body = await response.content.read(LOG_BODY_LIMIT)
+                    raise UpstreamError(response.status, body.decode(errors="replace"))
                 if response.status == 200:
-                    data = await response.json()
-                    logger.info(f"✅ Расписание получено!")
-                    
-                    # ⭐ ВАЖНО: API возвращает {"data": {...}}
-                    if "data" in data and "lessons" in data["data"]:
-                        return data["data"]  # Возвращаем только data часть
-                    else:
-                        logger.error("❌ Неверная структура данных от API")
-                        return None
-                    
-                elif response.status == 401:
-                    # Токен невалиден, пробуем обновить
-                    logger.warning("🔄 Токен невалиден, пробуем обновить...")
-                    if await refresh_jwt_token():
-                        return await get_schedule(group_id, day_of_week)
-                    else:
-                        return None
-                        
+                    body = await response.json()
                 elif response.status == 400:
-                    error_data = await response.json()
-                    logger.error(f"❌ Ошибка 400: {error_data}")
-                    return {"error": "bad_request", "message": error_data.get('msg', 'Неверные параметры')}
-                        
-                elif response.status == 404:
-                    logger.error(f"❌ Расписание не найдено для группы {group_id}")
-                    return {"error": "not_found", "message": "Расписание не найдено"}
-                    
-                elif response.status == 429:
-                    logger.warning("⏳ Превышен лимит запросов")
-                    return {"error": "rate_limit", "message": "Превышен лимит запросов"}
-                    
+                    body = await response.json()
                 else:
-                    logger.error(f"❌ Ошибка получения расписания: {response.status}")
-                    error_text = await response.text()
-                    logger.error(f"📄 Текст ошибки: {error_text}")
-                    return None
-                    
+                    body = None
+                api_hedger.record(loop.time() - started)
+                return response.status, body, response.headers.get("Retry-After"), permit
+        except asyncio.TimeoutError:
+            status = "timeout"
+            raise
+        except asyncio.CancelledError:
+            # Проигравшая подстраховка или отмена вызывающего
+            status = "cancelled"
+            raise
+        finally:
+            upstream_latency.observe(loop.time() - started, endpoint="get-schedule", status=status)
+    
+    async def _hedge():
+        return await _attempt(await rate_governor.acquire(priority, deadline))
+    
+    logger.info(f"📅 Запрашиваем расписание: группа {group_id}, день {day_of_week}")
+    renewed = False
+    attempt = 0
+    
+    while True:
+        try:
+            api_breaker.before()
+        except CircuitOpen:
+            return None
+        
+        access_token = token_manager.access_token
+        try:
+            permit = await rate_governor.acquire(priority, deadline)
+            status, body, retry_after, permit = await api_hedger.call(
+                lambda permit=permit: _attempt(permit),
+                enabled=HEDGE_ENABLED and priority == Priority.INTERACTIVE,
+                hedge=_hedge,
+            )
+        except RateLimitExceeded:
+            api_breaker.release()
+            logger.warning("⏳ Превышен лимит запросов")
+            return {"error": "rate_limit", "message": "Превышен лимит запросов"}
+        except (asyncio.TimeoutError, aiohttp.ClientError, UpstreamError) as e:
+            api_breaker.failure()
+            logger.error(f"🚫 Ошибка запроса расписания: {e!r}")
+            attempt += 1
+            if await api_retry.wait(attempt, deadline):
+                continue
+            return None
+        except Exception as e:
+            api_breaker.release()
+            logger.error(f"🚫 Ошибка: {e}")
+            return None
+        
+        if status == 429:
+            # Тормозим все запросы и встаём в очередь заново
+            api_breaker.release()
+            rate_governor.on_rate_limited(parse_retry_after(retry_after), permit)
+            continue
+        
+        api_breaker.success()
+        rate_governor.on_success()
+        
+        if status == 200:
+            logger.info(f"✅ Расписание получено!")
+            
+            # ⭐ ВАЖНО: API возвращает {"data": {...}}
+            if "data" in body and "lessons" in body["data"]:
+                return body["data"]  # Возвращаем только data часть
+            else:
+                logger.error("❌ Неверная структура данных от API")
+                return None
+            
+        elif status == 401:
+            # Токен невалиден, пробуем обновить - один раз, без рекурсии
+            logger.warning("🔄 Токен невалиден, пробуем обновить...")
+            if not renewed and await token_manager.renew(stale_token=access_token):
+                renewed = True
+                continue
+            return None
+                
+        elif status == 400:
+            logger.error(f"❌ Ошибка 400: {truncate(body, LOG_BODY_LIMIT)}")
+            return {"error": "bad_request", "message": body.get('msg', 'Неверные параметры')}
+                
+        elif status == 404:
+            logger.error(f"❌ Расписание не найдено для группы {group_id}")
+            return {"error": "not_found", "message": "Расписание не найдено"}
+            
+        else:
+            logger.error(f"❌ Ошибка получения расписания: {status}")
+            return None
+
+async def fetch_groups():
+    """
+    Список групп через API; None - оставить прежний каталог
+    """
+    if not await token_manager.ensure():
+        return None
+    
+    deadline = asyncio.get_running_loop().time() + API_DEADLINES[Priority.PREFETCH]
+    try:
+        permit = await rate_governor.acquire(Priority.PREFETCH, deadline)
+    except RateLimitExceeded:
+        return None
+    
+    access_token = token_manager.access_token
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    status = "error"
+    try:
+        async with api_client.get(
+            GROUPS_ENDPOINT,
+            headers={"Authorization": f"Bearer {access_token}"}
+        ) as response:
+            status = response.status
+            if response.status != 429:
+                rate_governor.on_success()
+            
+            if response.status == 200:
+                return parse_groups(await response.json())
+            
+            if response.status == 401:
+                await token_manager.renew(stale_token=access_token)
+            elif response.status == 429:
+                rate_governor.on_rate_limited(parse_retry_after(response.headers.get("Retry-After")), permit)
+            logger.error(f"❌ Ошибка получения списка групп: {response.status}")
+            return None
     except Exception as e:
+        if isinstance(e, asyncio.TimeoutError):
+            status = "timeout"
         logger.error(f"🚫 Ошибка: {e}")
         return None
+    finally:
+        upstream_latency.observe(loop.time() - started, endpoint="get-groups", status=status)
 
-
-
-# Клавиатура выбора группы
-def get_groups_keyboard():
-    # ЗАМЕНИ НА РЕАЛЬНЫЕ ГРУППЫ ТВОЕГО КОЛЛЕДЖА
-    groups = {
-        "31": "31",
-        "ISP-102": "ИСП-102", 
-        "PROG-201": "ПРОГ-201",
-        "PROG-202": "ПРОГ-202"
-    }
-    
-    buttons = []
-    for group_id, group_name in groups.items():
-        buttons.append([InlineKeyboardButton(text=group_name, callback_data=f"group_{group_id}")])
-    
-    return InlineKeyboardMarkup(inline_keyboard=buttons)
+# Клавиатура выбора группы (страницы собраны заранее для текущей версии каталога)
+def get_groups_keyboard(page=0):
+    return group_catalog.keyboard(page)
 
 # Клавиатура дней недели
 def get_days_keyboard():
@@ -280,6 +694,7 @@ def get_days_keyboard():
     # Дополнительные кнопки
     buttons.extend([
         [InlineKeyboardButton(text="📅 Сегодня", callback_data="today")],
+        [InlineKeyboardButton(text="🗓 Вся неделя", callback_data="week")],
         [InlineKeyboardButton(text="🔄 Сменить группу", callback_data="change_group")]
     ])
     
@@ -289,19 +704,19 @@ def get_days_keyboard():
 @dp.message(Command("start"))
 async def cmd_start(message: types.Message):
     # Проверяем аутентификацию
-    if not await ensure_valid_token():
-        await message.answer("❌ Ошибка подключения к API. Проверь учетные данные.")
+    if not await token_manager.ensure():
+        await sender.send(message.chat.id, "❌ Ошибка подключения к API. Проверь учетные данные.")
         return
     
     user_id = message.from_user.id
     
     if user_id not in user_groups:
-        await message.answer("👋 Привет! Я бот с расписанием занятий.\n\n📚 Выбери свою группу:", 
-                           reply_markup=get_groups_keyboard())
+        await sender.send(message.chat.id, "👋 Привет! Я бот с расписанием занятий.\n\n📚 Выбери свою группу или напиши её название (например, ИСП):", 
+                          reply_markup=get_groups_keyboard())
     else:
         group_name = user_groups[user_id]
-        await message.answer(f"📅 Твоя группа: {group_name}\n\nВыбери день для просмотра расписания:", 
-                           reply_markup=get_days_keyboard())
+        await sender.send(message.chat.id, f"📅 Твоя группа: {group_name}\n\nВыбери день для просмотра расписания:", 
+                          reply_markup=get_days_keyboard())
 
 # Обработчик выбора группы
 @dp.callback_query(F.data.startswith("group_"))
@@ -311,10 +726,10 @@ async def handle_group_select(callback: types.CallbackQuery):
     
     user_groups[user_id] = group_id
     
-    await callback.message.edit_text(
-        f"✅ Группа {group_id} выбрана!\n\nВыбери день для просмотра расписания:",
+    await sender.submit(callback.message.chat.id, lambda: callback.message.edit_text(
+        f"✅ Группа {group_catalog.name(group_id)} выбрана!\n\nВыбери день для просмотра расписания:",
         reply_markup=get_days_keyboard()
-    )
+    ))
 
 # Обработчик выбора дня
 @dp.callback_query(F.data.startswith("day_"))
@@ -335,22 +750,16 @@ async def handle_day_select(callback: types.CallbackQuery):
     
     if isinstance(schedule_data, dict) and "error" in schedule_data:
         error_message = schedule_data.get("message", "Произошла ошибка")
-        await callback.message.answer(f"❌ {error_message}")
+        await sender.send(callback.message.chat.id, f"❌ {error_message}")
         return
     
     if schedule_data:
-        response = format_schedule_response(schedule_data, group_id, day_number)
-        
-        # ⭐ ВАЖНО: Отправляем обычным сообщением вместо всплывающего окна
-        if len(response) > 4000:  # Telegram ограничение на сообщение
-            # Разбиваем на части
-            parts = split_long_message(response)
-            for part in parts:
-                await callback.message.answer(part)
-        else:
-            await callback.message.answer(response)
+        # ⭐ ВАЖНО: Отправляем обычным сообщением вместо всплывающего окна.
+        # Части уже разбиты по лимиту Telegram и лежат в кеше рендера
+        parts = renderer.render_parts(schedule_data, group_id, day_number)
+        await sender.send_parts(callback.message.chat.id, parts)
     else:
-        await callback.message.answer("❌ Не удалось загрузить расписание")
+        await sender.send(callback.message.chat.id, "❌ Не удалось загрузить расписание")
 
 # Обработчик "Сегодня"
 @dp.callback_query(F.data == "today")
@@ -365,7 +774,7 @@ async def handle_today(callback: types.CallbackQuery):
     today_number = datetime.now().weekday() + 1  # 1-понедельник, 6-суббота
     
     if today_number > 6:  # Воскресенье
-        await callback.message.answer("📅 Сегодня воскресенье - выходной! 🎉")
+        await sender.send(callback.message.chat.id, "📅 Сегодня воскресенье - выходной! 🎉")
         return
     
     group_id = user_groups[user_id]
@@ -376,131 +785,260 @@ async def handle_today(callback: types.CallbackQuery):
     
     if isinstance(schedule_data, dict) and "error" in schedule_data:
         error_message = schedule_data.get("message", "Произошла ошибка")
-        await callback.message.answer(f"❌ {error_message}")
+        await sender.send(callback.message.chat.id, f"❌ {error_message}")
         return
     
     if schedule_data:
-        response = format_schedule_response(schedule_data, group_id, today_number, "сегодня")
-        
-        if len(response) > 4000:
-            parts = split_long_message(response)
-            for part in parts:
-                await callback.message.answer(part)
-        else:
-            await callback.message.answer(response)
+        parts = renderer.render_parts(schedule_data, group_id, today_number, "сегодня")
+        await sender.send_parts(callback.message.chat.id, parts)
     else:
-        await callback.message.answer("❌ Не удалось загрузить расписание на сегодня")
+        await sender.send(callback.message.chat.id, "❌ Не удалось загрузить расписание на сегодня")
+
+# Обработчик "Вся неделя"
+@dp.callback_query(F.data == "week")
+async def handle_week(callback: types.CallbackQuery):
+    user_id = callback.from_user.id
+    
+    if user_id not in user_groups:
+        await callback.answer("❌ Сначала выбери группу!", show_alert=True)
+        return
+    
+    group_id = user_groups[user_id]
+    
+    await callback.answer("⏳ Загружаем расписание на неделю...")
+    
+    week_data = await get_week_schedule(group_id)
+    
+    if not any(week_data.values()):
+        await sender.send(callback.message.chat.id, "❌ Не удалось загрузить расписание на неделю")
+        return
+    
+    days = []
+    for day_number, schedule_data in week_data.items():
+        if isinstance(schedule_data, dict) and "error" in schedule_data:
+            error_message = schedule_data.get("message", "Произошла ошибка")
+            days.append(f"📅 <b>{group_id} - {DAYS_NAMES[day_number]}</b>\n\n❌ {error_message}\n")
+        elif schedule_data:
+            days.append(format_schedule_response(schedule_data, group_id, day_number))
+        else:
+            days.append(f"📅 <b>{group_id} - {DAYS_NAMES[day_number]}</b>\n\n❌ Не удалось загрузить\n")
+    
+    await sender.send_parts(callback.message.chat.id, split_long_message("\n".join(days)))
+
 # Обработчик смены группы
 @dp.callback_query(F.data == "change_group")
 async def handle_change_group(callback: types.CallbackQuery):
-    await callback.message.edit_text(
-        "🔄 Выбери свою группу:",
+    await sender.submit(callback.message.chat.id, lambda: callback.message.edit_text(
+        "🔄 Выбери свою группу или напиши её название:",
         reply_markup=get_groups_keyboard()
+    ))
+
+# Листание списка групп
+@dp.callback_query(F.data.startswith("groups_page_"))
+async def handle_groups_page(callback: types.CallbackQuery):
+    page = int(callback.data.replace("groups_page_", ""))
+    await callback.answer()
+    await sender.submit(callback.message.chat.id, lambda: callback.message.edit_reply_markup(
+        reply_markup=get_groups_keyboard(page)
+    ))
+
+@dp.callback_query(F.data == "groups_noop")
+async def handle_groups_noop(callback: types.CallbackQuery):
+    await callback.answer()
+
+# Подписка на вечернюю рассылку
+@dp.message(Command("subscribe"))
+async def cmd_subscribe(message: types.Message):
+    user_id = message.from_user.id
+    
+    if user_id not in user_groups:
+        await sender.send(message.chat.id, "❌ Сначала выбери группу!", reply_markup=get_groups_keyboard())
+        return
+    
+    if not BROADCAST_AVAILABLE:
+        # Не обещаем рассылку, которую никто не отправит
+        await sender.send(message.chat.id, "🔕 Вечерняя рассылка сейчас отключена, подписаться не получится")
+        return
+    
+    await asyncio.to_thread(subscriptions.subscribe, user_id, message.chat.id)
+    await sender.send(
+        message.chat.id,
+        f"🔔 Подписка оформлена! Каждый вечер в {BROADCAST_HOUR}:{BROADCAST_MINUTE:02d} "
+        f"пришлю расписание группы {user_groups[user_id]} на завтра.\n\n"
+        "Отписаться: /unsubscribe",
     )
 
+@dp.message(Command("unsubscribe"))
+async def cmd_unsubscribe(message: types.Message):
+    if await asyncio.to_thread(subscriptions.unsubscribe, message.from_user.id):
+        await sender.send(message.chat.id, "🔕 Подписка отменена")
+    else:
+        await sender.send(message.chat.id, "🔕 Ты и так не подписан. Подписаться: /subscribe")
+
 
 def split_long_message(text, max_length=4000):
     """
     Разбивает длинное сообщение на части
     """
-    if len(text) <= max_length:
-        return [text]
-    
-    parts = []
-    while text:
-        if len(text) <= max_length:
-            parts.append(text)
-            break
-        
-        # Ищем последний перенос строки перед max_length
-        split_pos = text.rfind('\n', 0, max_length)
-        
-        if split_pos == -1:
-            # Если нет переносов - разбиваем по границе слова
-            split_pos = text.rfind(' ', 0, max_length)
-            if split_pos == -1:
-                # Если нет пробелов - принудительно обрезаем
-                split_pos = max_length
-        
-        parts.append(text[:split_pos])
-        text = text[split_pos:].lstrip()
-    
-    return parts
+    return split_text(text, max_length)
 
 # Функция форматирования расписания
 def format_schedule_response(schedule_data, group_id, day_number, day_prefix=""):
     """
     Форматируем расписание компактно чтобы влезало в сообщения
     """
-    day_name = DAYS_NAMES[day_number]
-    day_display = f"{day_prefix} ({day_name})" if day_prefix else day_name
-    
-    response = f"📅 <b>{group_id} - {day_display}</b>\n\n"
-    
-    # ⭐ ВАЖНО: Используем HTML разметку для компактности
-    if isinstance(schedule_data, dict) and "lessons" in schedule_data:
-        lessons = schedule_data["lessons"]
-        
-        if lessons:
-            # Словарь для преобразования номеров пар во время
-            lesson_times = {
-                1: "8:30-10:00",
-                2: "10:10-11:40", 
-                3: "12:10-13:40",
-                4: "14:00-15:30",
-                5: "15:40-17:10",
-                6: "17:20-18:50",
-                7: "19:00-20:30",
-                8: "20:40-22:10"
-            }
-            
-            for lesson in lessons:
-                lesson_num = lesson.get("lesson_num", 0)
-                time_slot = lesson_times.get(lesson_num, "??:??")
-                
-                # ⭐ КОМПАКТНЫЙ ФОРМАТ:
-                response += f"<b>🕒 {time_slot}</b>\n"
-                response += f"   {lesson.get('subject', 'Предмет не указан')}\n"
-                
-                teacher = lesson.get('teacher', '')
-                classroom = lesson.get('classroom', '')
-                
-                if teacher and classroom:
-                    response += f"   👨‍🏫 {teacher} | 🏫 {classroom}\n"
-                elif teacher:
-                    response += f"   👨‍🏫 {teacher}\n"
-                elif classroom:
-                    response += f"   🏫 {classroom}\n"
-                
-                response += "\n"
-        else:
-            response += "🎉 <b>Занятий нет! Отдыхай!</b> 😊\n"
-    else:
-        response += "❌ <b>Расписание не найдено</b>\n"
-    
-    return response
+    return renderer.render(schedule_data, group_id, day_number, day_prefix)
 
 # Команда для проверки статуса
+def is_admin(user_id):
+    return user_id in ADMIN_IDS
+
+def format_seconds(seconds):
+    if seconds is None:
+        return "-"
+    if seconds == float("inf"):
+        return f">{LATENCY_BUCKETS[-1]:g}с"
+    return f"{seconds * 1000:.0f}мс" if seconds < 1 else f"{seconds:g}с"
+
+def latency_report():
+    """
+    p50/p95 по хендлерам, API, очереди к API и Telegram (оценка по корзинам гистограмм)
+    """
+    lines = ["⏱ Задержки p50/p95:"]
+    for histogram, title in (
+        (handler_latency, "хендлер"),
+        (upstream_latency, "API"),
+        (api_queue_wait, "очередь API"),
+        (telegram_latency, "Bot API"),
+    ):
+        for labels in histogram.keys():
+            name = " ".join(str(value) for value in labels.values())
+            lines.append(
+                f"  {title} {name}: {format_seconds(histogram.quantile(0.5, **labels))}/"
+                f"{format_seconds(histogram.quantile(0.95, **labels))} "
+                f"({histogram.count(**labels)})"
+            )
+    lines.append(
+        f"  очередь Telegram: {format_seconds(outbox_latency.quantile(0.5))}/"
+        f"{format_seconds(outbox_latency.quantile(0.95))} ({outbox_latency.count()})"
+    )
+    return "\n".join(lines)
+
 @dp.message(Command("status"))
 async def cmd_status(message: types.Message):
-    if await ensure_valid_token():
+    if not is_admin(message.from_user.id):
+        connected = await token_manager.ensure()
+        await sender.send(message.chat.id, "✅ Подключение к API активно" if connected else "❌ Нет подключения к API")
+        return
+    
+    if await token_manager.ensure():
         status_text = "✅ Подключение к API активно\n"
-        if token_expires_at:
-            expires_in = token_expires_at - datetime.now()
-            status_text += f"⏰ Токен истекает через: {expires_in}\n"
-        status_text += f"🔑 Группы доступны: {len(get_groups_keyboard().inline_keyboard)}"
+        tokens = token_manager.stats()
+        if tokens["expires_in"] is not None:
+            status_text += f"⏰ Токен истекает через: {tokens['expires_in']}\n"
+        status_text += (
+            f"🔐 Входов: {tokens['logins']}, обновлений: {tokens['refreshes']}, "
+            f"неудач: {tokens['failures']}, от соседних воркеров: {tokens['adopted']}\n"
+        )
+        catalog = group_catalog.stats()
+        status_text += (
+            f"🔑 Группы доступны: {catalog['groups']} (версия каталога {catalog['version']}, "
+            f"страниц {catalog['pages']}, ошибок загрузки {catalog['failures']})\n"
+        )
+        pool = api_client.stats()
+        status_text += (
+            f"🌐 HTTP пул: занято {pool['in_use']}/{pool['limit']}, "
+            f"простаивает {pool['idle']}, ждут {pool['waiting']}, "
+            f"запросов {pool['requests_total']}\n"
+        )
+        cache = schedule_cache.stats()
+        status_text += (
+            f"🗄 Кеш: {cache['size']}/{cache['maxsize']}, "
+            f"попаданий {cache['hits']} (устаревших {cache['stale_hits']}, "
+            f"ошибок {cache['negative_hits']}), промахов {cache['misses']}, "
+            f"вытеснено {cache['evictions']}, из общего кеша {cache['shared_hits']}, "
+            f"hit ratio {cache['hit_ratio']:.0%}\n"
+        )
+        flight = schedule_flight.stats()
+        status_text += (
+            f"🛫 Запросов к API: {flight['calls']}, склеено {flight['shared']}, "
+            f"в полёте {flight['in_flight']}\n"
+        )
+        warm = prewarmer.stats()
+        status_text += (
+            f"🔥 Прогрев: запусков {warm['runs']}, загружено {warm['fetched']}, "
+            f"пригодилось {warm['served']}, групп в статистике {warm['tracked_groups']}\n"
+        )
+        users = user_groups.stats()
+        status_text += (
+            f"👥 Пользователей: {users['users']}, ждут записи {users['pending']}, "
+            f"загрузка {users['load_seconds']:.2f}с\n"
+        )
+        breaker = api_breaker.stats()
+        hedge = api_hedger.stats()
+        hedge_delay = f"{hedge['delay']:.2f}с" if hedge["delay"] is not None else "нет данных"
+        status_text += (
+            f"⚡ Предохранитель: {breaker['state']}, размыканий {breaker['opened']}, "
+            f"отклонено {breaker['rejected']}, ошибок {breaker['failures']}, "
+            f"повторов {api_retry.retries}\n"
+            f"🪂 Подстраховка: порог {hedge_delay}, вторых запросов {hedge['hedged']}, "
+            f"из них быстрее первого {hedge['hedge_wins']}\n"
+        )
+        governor = rate_governor.stats()
+        status_text += (
+            f"🚦 Лимит API: {governor['rate']:.1f}/{governor['max_rate']:.0f} в сек, "
+            f"очередь {governor['queue_depth']}, ожидание ср. {governor['wait_avg']:.2f}с "
+            f"(макс. {governor['wait_max']:.2f}с), 429: {governor['rate_limited']}, "
+            f"не дождались {governor['timeouts']}\n"
+        )
+        outbox = sender.stats()
+        status_text += (
+            f"📤 Telegram: очередь {outbox['queue_depth']}, отправлено {outbox['sent']}, "
+            f"ошибок {outbox['failed']}, RetryAfter {outbox['retry_after']}, "
+            f"задержка ср. {outbox['latency_avg']:.2f}с (макс. {outbox['latency_max']:.2f}с)\n"
+        )
+        if snapshot is not None:
+            saved = snapshot.stats()
+            status_text += (
+                f"💾 Снимок: записано {saved['written']}, ждут записи {saved['pending']}, "
+                f"загружено при старте {saved['loaded']}, отдано при сбоях API {saved['served']}\n"
+            )
+        index = schedule_index.stats()
+        crawl = crawler.stats()
+        status_text += (
+            f"🕸 Справочник: преподавателей {index['teachers']}, аудиторий {index['rooms']}, "
+            f"обходов {crawl['passes']} (сейчас {crawl['progress']}/{crawl['total']}), "
+            f"изменений {index['updates']}\n"
+        )
+        inline = inline_lookups.stats()
+        status_text += f"🔍 Inline: запросов {inline['started']}, вытеснено {inline['superseded']}\n"
+        render = renderer.stats()
+        status_text += (
+            f"🖨 Рендер: в кеше {render['size']}/{render['maxsize']}, "
+            f"hit ratio {render['hit_ratio']:.0%}\n"
+        )
+        run = broadcaster.stats()
+        if run is None:
+            status_text += "📣 Рассылка: ещё не запускалась"
+        else:
+            state = "завершена" if run["finished_at"] else f"идёт (группа {run['last_group']})"
+            status_text += (
+                f"📣 Рассылка {run['run_id']}: {state}, групп {run['groups_done']}, "
+                f"отправлено {run['sent']}, ошибок {run['failed']}"
+            )
     else:
         status_text = "❌ Нет подключения к API"
     
-    await message.answer(status_text)
+    status_text += "\n\n" + latency_report()
+    await sender.send_parts(message.chat.id, split_text(status_text))
 
 # Команда для тестирования API
 @dp.message(Command("test"))
 async def cmd_test(message: types.Message):
     """Тестируем подключение к API"""
-    await message.answer("🧪 Тестируем API...")
+    await sender.send(message.chat.id, "🧪 Тестируем API...")
     
-    if await ensure_valid_token():
+    if await token_manager.ensure():
         # Пробуем получить расписание для тестовой группы
         test_group = "ISP-101"
         test_day = 1
@@ -508,31 +1046,370 @@ async def cmd_test(message: types.Message):
         schedule_data = await get_schedule(test_group, test_day)
         
         if schedule_data:
-            await message.answer(f"✅ API работает!\nТестовый запрос: группа {test_group}, день {test_day}")
+            await sender.send(message.chat.id, f"✅ API работает!\nТестовый запрос: группа {test_group}, день {test_day}")
+        else:
+            await sender.send(message.chat.id, "✅ Аутентификация работает, но расписание не найдено")
+    else:
+        await sender.send(message.chat.id, "❌ Ошибка аутентификации")
+# Где преподаватель сегодня
+@dp.message(Command("teacher"))
+async def cmd_teacher(message: types.Message, command: CommandObject):
+    if not command.args:
+        await sender.send(message.chat.id, "👨‍🏫 Использование: /teacher Фамилия")
+        return
+    
+    now = datetime.now()
+    day_number = now.weekday() + 1
+    if day_number > 6:
+        await sender.send(message.chat.id, "📅 Сегодня воскресенье - выходной! 🎉")
+        return
+    
+    found = schedule_index.find_teachers(command.args)
+    if not found:
+        await sender.send(message.chat.id, f"🔎 Преподаватель не найден{index_building_note()}")
+        return
+    if len(found) > 1:
+        names = "\n".join(f"• {name}" for name, _ in found)
+        await sender.send(message.chat.id, f"🔎 Уточни фамилию:\n{names}")
+        return
+    
+    name, key = found[0]
+    lessons = schedule_index.teacher_day(key, day_number)
+    if not lessons:
+        await sender.send(message.chat.id, f"👨‍🏫 {name}: сегодня пар нет")
+        return
+    
+    now_lesson, started = current_lesson(LESSON_SLOTS, now)
+    now_marker = " ⬅️ сейчас" if started else " ⬅️ следующая"
+    lines = [f"👨‍🏫 {name}, {DAYS_NAMES[day_number].lower()}:"]
+    for lesson_num, entries in lessons:
+        marker = now_marker if lesson_num == now_lesson else ""
+        for group_id, subject, classroom in entries:
+            lines.append(
+                f"🕒 {LESSON_TIMES.get(lesson_num, '??:??')} - {group_id}, {subject}"
+                f"{f', ауд. {classroom}' if classroom else ''}{marker}"
+            )
+    await sender.send_parts(message.chat.id, split_long_message("\n".join(lines)))
+
+# Занятость аудитории сегодня: /room 204 или /room 204 3 (номер пары)
+@dp.message(Command("room"))
+async def cmd_room(message: types.Message, command: CommandObject):
+    args = (command.args or "").split()
+    if not args:
+        await sender.send(message.chat.id, "🏫 Использование: /room 204 или /room 204 3 (номер пары)")
+        return
+    
+    now = datetime.now()
+    day_number = now.weekday() + 1
+    if day_number > 6:
+        await sender.send(message.chat.id, "📅 Сегодня воскресенье - все аудитории свободны 🎉")
+        return
+    
+    found = schedule_index.find_rooms(args[0])
+    if not found:
+        await sender.send(message.chat.id, f"🔎 Аудитория не найдена{index_building_note()}")
+        return
+    if len(found) > 1:
+        rooms = ", ".join(name for name, _ in found)
+        await sender.send(message.chat.id, f"🔎 Уточни номер: {rooms}")
+        return
+    
+    name, key = found[0]
+    if len(args) > 1 and args[1].isdigit():
+        lesson_num = int(args[1])
+        busy = schedule_index.room_busy(key, day_number, lesson_num)
+        time_slot = LESSON_TIMES.get(lesson_num, "??:??")
+        if busy:
+            group_id, subject, teacher = busy[0]
+            await sender.send(message.chat.id, f"🔴 Ауд. {name}, {time_slot}: занята - {group_id}, {subject}")
+        else:
+            await sender.send(message.chat.id, f"🟢 Ауд. {name}, {time_slot}: свободна")
+        return
+    
+    busy = dict(schedule_index.room_day(key, day_number))
+    now_lesson, started = current_lesson(LESSON_SLOTS, now)
+    now_marker = " ⬅️ сейчас" if started else " ⬅️ следующая"
+    lines = [f"🏫 Ауд. {name}, {DAYS_NAMES[day_number].lower()}:"]
+    for lesson_num, time_slot in LESSON_TIMES.items():
+        marker = now_marker if lesson_num == now_lesson else ""
+        entries = busy.get(lesson_num)
+        if entries:
+            group_id, subject, teacher = entries[0]
+            lines.append(f"🔴 {time_slot} - {group_id}, {subject}{marker}")
         else:
-            await message.answer("✅ Аутентификация работает, но расписание не найдено")
+            lines.append(f"🟢 {time_slot} - свободна{marker}")
+    await sender.send(message.chat.id, "\n".join(lines))
+
+def index_building_note():
+    progress = crawler.stats()
+    if progress["passes"] == 0:
+        return f" (справочник ещё собирается: {progress['progress']}/{progress['total']})"
+    return ""
+
+# Inline-режим: "@bot ИСП-102 вторник" в любом чате
+@dp.inline_query()
+async def handle_inline_query(inline_query: types.InlineQuery):
+    user_id = inline_query.from_user.id
+    group_query, days = parse_inline_query(inline_query.query, DAYS_MAPPING)
+    
+    # Без группы в запросе - своя группа пользователя (ответ персональный)
+    personal = not group_query
+    if personal:
+        groups = [user_groups[user_id]] if user_id in user_groups else []
     else:
-        await message.answer("❌ Ошибка аутентификации")
+        groups = group_catalog.search(group_query, limit=3)
+    
+    if not groups:
+        await inline_query.answer(
+            [], cache_time=INLINE_ERROR_CACHE_TIME, is_personal=personal,
+            button=InlineQueryResultsButton(text="Выбрать группу в боте", start_parameter="start"),
+        )
+        return
+    
+    # Одна группа - все запрошенные дни, несколько - только первый день
+    targets = [(groups[0], day) for day in days] if len(groups) == 1 else [(group_id, days[0]) for group_id in groups]
+    
+    # peek: промах посчитает get_schedule, нажатия клавиш не портят hit ratio
+    cached = {}
+    for group_id, day_number in targets:
+        key = schedule_cache.make_key(group_id, day_number)
+        value, fresh = schedule_cache.peek(key)
+        if value is not None:
+            cached[(group_id, day_number)] = value
+            if not fresh:
+                schedule_cache.refresh_in_background(
+                    key, lambda group_id=group_id, day_number=day_number: load_schedule(
+                        group_id, day_number, Priority.PREFETCH
+                    )
+                )
+    
+    async def _lookup():
+        missing = [target for target in targets if target not in cached]
+        if missing:
+            loaded = await asyncio.wait_for(
+                asyncio.gather(*(get_schedule(group_id, day_number) for group_id, day_number in missing)),
+                INLINE_FETCH_TIMEOUT,
+            )
+            cached.update(zip(missing, loaded))
+        return [(target, cached[target]) for target in targets]
+    
+    # Всё есть в кеше - отвечаем сразу, иначе ждём, пока пользователь допечатает
+    try:
+        found = await inline_lookups.run(user_id, _lookup, debounce=len(cached) < len(targets))
+    except asyncio.TimeoutError:
+        found = [(target, cached.get(target)) for target in targets]
+    if found is None:
+        return
+    
+    results = []
+    complete = True
+    for (group_id, day_number), schedule_data in found:
+        title = f"{group_catalog.name(group_id)} - {DAYS_NAMES[day_number]}"
+        if schedule_data is None or (isinstance(schedule_data, dict) and "error" in schedule_data):
+            complete = False
+            continue
+        text = renderer.render_parts(schedule_data, group_id, day_number)[0]
+        lessons = schedule_data.get("lessons") or []
+        description = f"Пар: {len(lessons)}" if lessons else "Занятий нет"
+        results.append(InlineQueryResultArticle(
+            id=f"{group_id}:{day_number}"[:64],
+            title=title,
+            description=description,
+            input_message_content=InputTextMessageContent(message_text=text, parse_mode="HTML"),
+        ))
+    
+    await inline_query.answer(
+        results,
+        cache_time=INLINE_CACHE_TIME if complete else INLINE_ERROR_CACHE_TIME,
+        is_personal=personal,
+    )
+
+# Поиск группы по тексту: "ИСП", "исп-1", "102" (только в личке - в группах это обычная переписка)
+@dp.message(F.chat.type == "private", F.text & ~F.text.startswith("/"))
+async def handle_group_search(message: types.Message):
+    markup = group_catalog.search_keyboard(message.text)
+    if markup is None:
+        await sender.send(message.chat.id, "🔎 Группа не найдена. Попробуй начало названия или выбери из списка:",
+                          reply_markup=get_groups_keyboard())
+    else:
+        await sender.send(message.chat.id, "🔎 Нашлись группы:", reply_markup=markup)
+
+
+async def restore_snapshot():
+    """
+    Прогреваем кеш и справочник преподавателей из снимка на диске
+    """
+    if snapshot is None:
+        return 0
+    try:
+        rows = await snapshot.load()
+    except Exception as e:
+        logger.error(f"🚫 Ошибка загрузки снимка расписаний: {e}")
+        return 0
+    
+    # Снимок отдаёт новые первыми, а в LRU последними должны лечь самые свежие
+    for key, value, fetched_at in reversed(rows[:schedule_cache.maxsize]):
+        schedule_cache.restore(key, value, fetched_at)
+    for (group_id, day_of_week), value, _ in rows:
+        schedule_index.update(group_id, day_of_week, value)
+    return len(rows)
+
+async def startup(prewarm=True, broadcast=True, crawl_upstream=True, metrics_port=METRICS_PORT):
+    """
+    Общий запуск для одиночного процесса и воркера
+    """
+    global metrics_runner
+    if metrics_port:
+        metrics_runner = await metrics.serve(METRICS_HOST, metrics_port)
+    await user_groups.load()
+    user_groups.start()
+    restored = await restore_snapshot()
+    # Пишем снимок, даже если прежний не прочитался - следующий рестарт получит свежий
+    if snapshot is not None:
+        snapshot.start()
+    
+    # Пробуем аутентифицироваться при старте
+    if not await token_manager.ensure():
+        if not restored:
+            logger.error("❌ Не удалось аутентифицироваться в API")
+            return False
+        # Есть сохранённые расписания - работаем на них, токен получим в фоне
+        logger.warning("⚠️ API недоступен, работаем на сохранённых расписаниях")
+    
+    token_manager.start()
+    await group_catalog.refresh()
+    group_catalog.start()
+    if CRAWL_ENABLED:
+        if not crawl_upstream:
+            # Расписания в общий кеш загружает воркер 0, остальные только читают
+            crawler.load = lambda group_id, day_of_week: crawl_schedule(group_id, day_of_week, upstream=False)
+            crawler.rate = None
+            crawler.interval = CRAWL_SHARED_INTERVAL
+        crawler.start()
+    if PREWARM_ENABLED and prewarm:
+        prewarmer.seed(user_groups.values())
+        prewarmer.start()
+    if BROADCAST_ENABLED and broadcast:
+        if USER_STORE == "sqlite":
+            broadcaster.start()
+        else:
+            logger.warning("⚠️ Рассылка работает только с USER_STORE=sqlite")
+    return True
+
+async def shutdown():
+    await broadcaster.stop()
+    if metrics_runner is not None:
+        await metrics_runner.cleanup()
+    await group_catalog.stop()
+    await crawler.stop()
+    await sender.close()
+    await prewarmer.stop()
+    await token_manager.stop()
+    await schedule_cache.close()
+    if snapshot is not None:
+        await snapshot.close()
+    await rate_governor.close()
+    await api_client.close()
+    await bot.session.close()
+    await user_groups.close()
+    await asyncio.to_thread(subscriptions.close)
+    if shared_backend is not None:
+        shared_backend.close()
+
+def run_worker(index, count, updates):
+    """
+    Точка входа процесса-воркера
+    """
+    asyncio.run(worker_main(index, count, updates))
+
+async def worker_main(index, count, updates):
+    # В памяти воркера только его пользователи - апдейты раскладываются по user_id
+    user_groups.shard = (index, count)
+    # Рассылку своим подписчикам ведёт каждый воркер: так она идёт на
+    # полном лимите Telegram, а не на доле одного воркера
+    subscriptions.shard = (index, count)
+    logger.info(f"👷 Воркер {index + 1}/{count} запускается...")
+    
+    try:
+        # Прогрев нужен один на всех: кеш общий. Популярность групп у
+        # воркера 0 считается по его доле пользователей - это случайная выборка
+        if await startup(
+            prewarm=index == 0,
+            crawl_upstream=index == 0,
+            metrics_port=METRICS_PORT + index if METRICS_PORT else 0,
+        ):
+            await consume_updates(
+                updates,
+                lambda update: dp.feed_raw_update(bot, update),
+                concurrency=WORKER_CONCURRENCY,
+            )
+    finally:
+        await shutdown()
+
+async def run_supervisor():
+    """
+    Один слушатель (webhook или polling) раздаёт апдейты WORKERS процессам
+    """
+    pool = WorkerPool(WORKERS, run_worker, queue_size=WORKER_QUEUE_SIZE)
+    pool.start()
+    
+    try:
+        if RUN_MODE == "webhook":
+            webhook_server.router = pool.dispatch
+            await webhook_server.run(
+                WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_URL,
+                drain_timeout=WEBHOOK_DRAIN_TIMEOUT,
+            )
+        else:
+            stop = asyncio.Event()
+            loop = asyncio.get_running_loop()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                try:
+                    loop.add_signal_handler(sig, stop.set)
+                except (NotImplementedError, RuntimeError):
+                    pass
+            
+            polling = asyncio.create_task(
+                poll_updates(bot, pool.dispatch, dp.resolve_used_update_types(), stop)
+            )
+            await stop.wait()
+            polling.cancel()
+            await asyncio.gather(polling, return_exceptions=True)
+    finally:
+        await asyncio.to_thread(pool.close)
+        await bot.session.close()
 
 async def main():
     # Проверяем настройки
-    if not all([BOT_TOKEN, API_USERNAME, API_PASSWORD]):
+    if not all([BOT_TOKEN, API_USERNAME, API_PASSWORD]) or (RUN_MODE == "webhook" and not WEBHOOK_URL):
         missing = []
         if not BOT_TOKEN: missing.append("BOT_TOKEN")
         if not API_USERNAME: missing.append("API_USERNAME")
         if not API_PASSWORD: missing.append("API_PASSWORD")
+        if RUN_MODE == "webhook" and not WEBHOOK_URL: missing.append("WEBHOOK_URL")
         
         logger.error(f"❌ Отсутствуют переменные: {', '.join(missing)}")
         return
     
     logger.info("🚀 Запускаем бота с JWT аутентификацией...")
     
-    # Пробуем аутентифицироваться при старте
-    if await ensure_valid_token():
-        logger.info("✅ Бот успешно запущен!")
-        await dp.start_polling(bot)
-    else:
-        logger.error("❌ Не удалось аутентифицироваться в API")
+    if WORKERS > 1:
+        logger.info(f"✅ Бот успешно запущен! Режим: {RUN_MODE}, воркеров: {WORKERS}")
+        await run_supervisor()
+        return
+    
+    try:
+        if await startup():
+            logger.info(f"✅ Бот успешно запущен! Режим: {RUN_MODE}")
+            if RUN_MODE == "webhook":
+                await webhook_server.run(
+                    WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_URL,
+                    drain_timeout=WEBHOOK_DRAIN_TIMEOUT,
+                )
+            else:
+                await dp.start_polling(bot)
+    finally:
+        await shutdown()
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -0,0 +1,232 @@
+import bisect
+import contextvars
+import logging
+import time
+import uuid
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограмм задержек, секунды
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Trace id текущего апдейта: задачи, созданные при его обработке, наследуют его
+trace_id = contextvars.ContextVar("trace_id", default="-")
+
+
+def new_trace_id(update_id=None):
+    suffix = uuid.uuid4().hex[:6]
+    return f"{update_id}-{suffix}" if update_id is not None else suffix
+
+
+class TraceIdFilter(logging.Filter):
+    """
+    Добавляет trace_id в каждую запись лога (для %(trace_id)s в формате)
+    """
+
+    def filter(self, record):
+        record.trace_id = trace_id.get()
+        return True
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    """
+    Гистограмма в формате Prometheus: накопительные корзины, сумма и число
+    наблюдений на каждый набор меток
+    """
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        # метки -> [счётчики по корзинам (+Inf последним), сумма, количество]
+        self._series = {}
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def count(self, **labels):
+        series = self._series.get(tuple(str(labels.get(name, "")) for name in self.labels))
+        return series[2] if series else 0
+
+    def quantile(self, q, **labels):
+        """
+        Оценка квантиля по корзинам (верхняя граница корзины); None - нет данных
+        """
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        series = self._series.get(key)
+        if series is None or series[2] == 0:
+            return None
+        rank = q * series[2]
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), series[0]):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def keys(self):
+        return [dict(zip(self.labels, key)) for key in sorted(self._series)]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, [('le', le)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+class Collector:
+    """
+    Значения, которые компоненты и так считают в stats(): читаем при
+    экспорте. fn() возвращает число или {значение метки: число}
+    """
+
+    def __init__(self, name, help, fn, kind="gauge", label=None):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.kind = kind
+        self.label = label
+
+    def render(self):
+        try:
+            values = self.fn()
+        except Exception as e:
+            logger.error(f"🚫 Ошибка метрики {self.name}: {e}")
+            return []
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        if isinstance(values, dict):
+            for label_value, value in sorted(values.items(), key=lambda item: str(item[0])):
+                if value is not None:
+                    lines.append(f"{self.name}{_format_labels([self.label], [label_value])} {float(value)}")
+        elif values is not None:
+            lines.append(f"{self.name} {float(values)}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self, prefix="ebot"):
+        self.prefix = prefix
+        self._metrics = {}
+
+    def _register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(f"{self.prefix}_{name}", help, labels, buckets))
+
+    def collect(self, name, help, fn, kind="gauge", label=None):
+        return self._register(Collector(f"{self.prefix}_{name}", help, fn, kind, label))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    async def handle(self, request):
+        return web.Response(text=self.render(), content_type="text/plain", charset="utf-8",
+                            headers={"X-Content-Type-Options": "nosniff"})
+
+    async def serve(self, host, port):
+        """
+        Отдельный HTTP сервер с /metrics; возвращает runner для cleanup()
+        """
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        logger.info(f"📈 Метрики: http://{host}:{port}/metrics")
+        return runner
+
+
+class TraceMiddleware:
+    """
+    Внешний middleware апдейтов: trace id, общее время обработки апдейта
+    и предупреждение о медленных
+    """
+
+    def __init__(self, histogram, slow_seconds=2.0):
+        self.histogram = histogram
+        self.slow_seconds = slow_seconds
+
+    async def __call__(self, handler, event, data):
+        token = trace_id.set(new_trace_id(getattr(event, "update_id", None)))
+        started = time.perf_counter()
+        kind = getattr(event, "event_type", "unknown")
+        try:
+            return await handler(event, data)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.histogram.observe(elapsed, type=kind)
+            if elapsed >= self.slow_seconds:
+                logger.warning(f"🐢 Медленный апдейт ({kind}): {elapsed:.2f}с")
+            trace_id.reset(token)
+
+
+class HandlerTimingMiddleware:
+    """
+    Внутренний middleware: время каждого хендлера по имени функции
+    """
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    async def __call__(self, handler, event, data):
+        handler_object = data.get("handler")
+        name = getattr(getattr(handler_object, "callback", None), "__name__", "unknown")
+        started = time.perf_counter()
+        outcome = "ok"
+        try:
+            return await handler(event, data)
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            self.histogram.observe(time.perf_counter() - started, handler=name, outcome=outcome)
+
+
+class TelegramTimingMiddleware:
+    """
+    Middleware сессии бота: время каждого запроса к Bot API по методу
+    """
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    async def __call__(self, make_request, bot, method):
+        started = time.perf_counter()
+        outcome = "ok"
+        try:
+            return await make_request(bot, method)
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            self.histogram.observe(time.perf_counter() - started, method=type(method).__name__, outcome=outcome)
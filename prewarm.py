@@ -0,0 +1,161 @@
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+
+class CachePrewarmer:
+    """
+    Прогрев кеша расписаний перед пиками нагрузки.
+
+    Пики - начало и конец каждой пары из LESSON_TIMES (звонки). За lead_time
+    секунд до пика загружаем расписание на сегодня и завтра для max_groups
+    самых популярных групп, не быстрее rate запросов в секунду и не больше
+    budget запросов за один прогрев.
+    """
+
+    def __init__(self, cache, load, lesson_times, lead_time=120, max_groups=20,
+                 rate=5.0, budget=200):
+        self.cache = cache
+        self.load = load
+        self.lead_time = lead_time
+        self.max_groups = max_groups
+        self.rate = rate
+        self.budget = budget
+
+        self.peaks = self.parse_peaks(lesson_times)
+        self.popularity = Counter()
+        self._decayed_on = None
+        self._task = None
+
+        self.runs = 0
+        self.fetched = 0
+        self.skipped = 0
+
+    @staticmethod
+    def parse_peaks(lesson_times):
+        """
+        "8:30-10:00" -> звонки в 8:30 и 10:00. Возвращает отсортированные (час, минута)
+        """
+        peaks = set()
+        for time_range in lesson_times.values():
+            for bell in time_range.split("-"):
+                hour, minute = bell.strip().split(":")
+                peaks.add((int(hour), int(minute)))
+        return sorted(peaks)
+
+    def record(self, group_id):
+        """
+        Учитываем запрос расписания группы
+        """
+        self.popularity[str(group_id)] += 1
+
+    def seed(self, groups):
+        """
+        Начальная популярность - сколько пользователей выбрали группу
+        """
+        for group_id in groups:
+            self.record(group_id)
+
+    def next_peak(self, now):
+        for days_ahead in range(2):
+            day = now.date() + timedelta(days=days_ahead)
+            for hour, minute in self.peaks:
+                peak = datetime.combine(day, datetime.min.time()).replace(hour=hour, minute=minute)
+                if peak - timedelta(seconds=self.lead_time) > now:
+                    return peak
+        return None
+
+    def _decay(self, today):
+        # Раз в сутки уменьшаем вес старых запросов, чтобы учитывать свежие
+        if self._decayed_on != today:
+            if self._decayed_on is not None:
+                self.popularity = Counter(
+                    {group_id: count // 2 for group_id, count in self.popularity.items() if count > 1}
+                )
+            self._decayed_on = today
+
+    @staticmethod
+    def target_days(now):
+        """
+        Сегодня и завтра (1-понедельник, 6-суббота), без воскресенья
+        """
+        today = now.weekday() + 1
+        tomorrow = today % 7 + 1
+        return [day for day in (today, tomorrow) if day <= 6]
+
+    async def warm(self, now=None):
+        """
+        Один прогрев: грузим всё, что не останется свежим до конца пика
+        """
+        now = now or datetime.now()
+        self._decay(now.date())
+        self.runs += 1
+
+        # Запись должна оставаться свежей ещё хотя бы полчаса после звонка
+        needed_for = self.lead_time + 1800
+        groups = [group_id for group_id, _ in self.popularity.most_common(self.max_groups)]
+        spent = 0
+
+        for group_id in groups:
+            for day in self.target_days(now):
+                key = self.cache.make_key(group_id, day)
+                if self.cache.fresh_for(key) >= needed_for:
+                    self.skipped += 1
+                    continue
+                if spent >= self.budget:
+                    logger.info(f"🔥 Прогрев: бюджет {self.budget} запросов исчерпан")
+                    return spent
+
+                try:
+                    await self.load(group_id, day)
+                    self.cache.mark_prefetched(key)
+                    self.fetched += 1
+                except Exception as e:
+                    logger.error(f"🚫 Ошибка прогрева {group_id}, день {day}: {e}")
+                spent += 1
+                await asyncio.sleep(1 / self.rate)
+
+        logger.info(f"🔥 Прогрев: {len(groups)} групп, {spent} запросов к API")
+        return spent
+
+    async def _run(self):
+        while True:
+            now = datetime.now()
+            peak = self.next_peak(now)
+            if peak is None:
+                await asyncio.sleep(3600)
+                continue
+
+            wait = (peak - timedelta(seconds=self.lead_time) - now).total_seconds()
+            await asyncio.sleep(wait)
+
+            try:
+                await self.warm()
+            except Exception as e:
+                logger.error(f"🚫 Ошибка прогрева кеша: {e}")
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self):
+        cache = self.cache.stats()
+        return {
+            "runs": self.runs,
+            "fetched": self.fetched,
+            "skipped": self.skipped,
+            "tracked_groups": len(self.popularity),
+            "served": cache["prefetch_served"],
+        }
@@ -0,0 +1,234 @@
+import asyncio
+import heapq
+import itertools
+import logging
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from enum import IntEnum
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """
+    Чем меньше значение, тем раньше запрос получит разрешение
+    """
+    AUTH = 0         # вход и обновление токена: без них остальные получат 401
+    INTERACTIVE = 1  # нажатия пользователей
+    PREFETCH = 2     # прогрев и фоновые обновления кеша
+    BROADCAST = 3    # рассылки и обходы
+
+
+class RateLimitExceeded(Exception):
+    """
+    Запрос не дождался разрешения до своего дедлайна
+    """
+
+
+def parse_retry_after(value):
+    """
+    Retry-After: число секунд или HTTP-дата. None, если не разобрали
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class RateGovernor:
+    """
+    Общий для процесса ограничитель запросов к API.
+
+    Token bucket со скоростью rate запросов/с и запасом burst. Ответ 429
+    вдвое снижает скорость и ставит выдачу на паузу (на Retry-After, если
+    он есть) - не чаще раза за паузу: 429 на разрешения, выданные до
+    последнего снижения, скорость уже не трогают. После паузы, пока
+    ответы успешные, скорость удваивается каждые recovery_time секунд,
+    пока не вернётся к max_rate. Ожидающие стоят в очереди по приоритету; запрос, не
+    дождавшийся разрешения до дедлайна, получает RateLimitExceeded.
+    """
+
+    def __init__(self, rate=10.0, burst=10, min_rate=0.5, recovery_time=1.0,
+                 max_queue=10000, on_wait=None):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.recovery_time = recovery_time
+        self.max_queue = max_queue
+        # on_wait(секунды ожидания, priority=...) - для метрик, на каждый acquire
+        self.on_wait = on_wait
+
+        self._tokens = float(burst)
+        self._updated = None
+        self._paused_until = 0.0
+        # Номер снижения скорости; разрешение помнит, при каком выдано
+        self._generation = 0
+        # Скорость сразу после последнего снижения, от неё считаем возврат
+        self._reduced_rate = rate
+        # (priority, seq, deadline, future)
+        self._queue = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+        self.granted = 0
+        self.queued = 0
+        self.timeouts = 0
+        self.rate_limited = 0
+        self.waited = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _refill(self, now):
+        if self._updated is not None:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, priority=Priority.INTERACTIVE, deadline=None):
+        """
+        Ждём разрешения на запрос. deadline - время loop.time(), после
+        которого ждать бессмысленно. Возвращает разрешение для on_rate_limited
+        """
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        self._refill(now)
+
+        if not self._queue and now >= self._paused_until and self._tokens >= 1:
+            self._tokens -= 1
+            self.granted += 1
+            self._observe_wait(0.0, priority)
+            return self._generation
+
+        if len(self._queue) >= self.max_queue:
+            self.timeouts += 1
+            raise RateLimitExceeded("очередь запросов к API переполнена")
+
+        future = loop.create_future()
+        entry = (int(priority), next(self._seq), deadline, future)
+        heapq.heappush(self._queue, entry)
+        self.queued += 1
+        self._ensure_dispatcher()
+        self._wakeup.set()
+
+        timeout = None if deadline is None else max(0.0, deadline - now)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            # Разрешение могло прийти одновременно с таймаутом
+            if not (future.done() and not future.cancelled()):
+                future.cancel()
+                self.timeouts += 1
+                raise RateLimitExceeded("не дождались очереди к API") from None
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+
+        waited = loop.time() - now
+        self.waited += 1
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+        self._observe_wait(waited, priority)
+        return future.result()
+
+    def _observe_wait(self, waited, priority):
+        if self.on_wait is not None:
+            self.on_wait(waited, priority=Priority(priority).name.lower())
+
+    def _ensure_dispatcher(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._dispatch())
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while self._queue:
+            now = loop.time()
+            self._refill(now)
+
+            # Выкидываем отменённых и просроченных
+            while self._queue:
+                _, _, deadline, future = self._queue[0]
+                if future.done() or (deadline is not None and deadline <= now):
+                    heapq.heappop(self._queue)
+                    continue
+                break
+            if not self._queue:
+                break
+
+            if now < self._paused_until:
+                wait = self._paused_until - now
+            elif self._tokens >= 1:
+                _, _, _, future = heapq.heappop(self._queue)
+                self._tokens -= 1
+                self.granted += 1
+                future.set_result(self._generation)
+                continue
+            else:
+                wait = (1 - self._tokens) / self.rate
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+    def on_rate_limited(self, retry_after=None, permit=None):
+        """
+        API ответил 429: снижаем скорость и делаем паузу. permit - то, что
+        вернул acquire(); запросы, ушедшие до прошлого снижения, и 429 во
+        время паузы скорость повторно не снижают
+        """
+        now = asyncio.get_running_loop().time()
+        self.rate_limited += 1
+        if (permit is not None and permit < self._generation) or now < self._paused_until:
+            return
+        self._generation += 1
+        self.rate = self._reduced_rate = max(self.min_rate, self.rate / 2)
+        pause = retry_after if retry_after is not None else 1 / self.rate
+        self._paused_until = now + pause
+        self._tokens = 0.0
+        logger.warning(f"⏳ API просит притормозить: скорость {self.rate:.1f}/с, пауза {pause:.1f}с")
+
+    def on_success(self):
+        """
+        Успешный ответ: возвращаем скорость, удваивая её каждые
+        recovery_time секунд после окончания паузы
+        """
+        if self.rate < self.max_rate:
+            recovered = asyncio.get_running_loop().time() - self._paused_until
+            if recovered > 0:
+                self.rate = min(self.max_rate, self._reduced_rate * 2 ** (recovered / self.recovery_time))
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for _, _, _, future in self._queue:
+            future.cancel()
+        self._queue.clear()
+
+    def stats(self):
+        return {
+            "rate": self.rate,
+            "max_rate": self.max_rate,
+            "queue_depth": sum(1 for entry in self._queue if not entry[3].done()),
+            "granted": self.granted,
+            "queued": self.queued,
+            "timeouts": self.timeouts,
+            "rate_limited": self.rate_limited,
+            "wait_avg": self.wait_total / self.waited if self.waited else 0.0,
+            "wait_max": self.wait_max,
+        }
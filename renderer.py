@@ -0,0 +1,181 @@
+import hashlib
+import json
+from collections import OrderedDict
+from datetime import datetime
+
+MAX_MESSAGE_LENGTH = 4000
+
+
+def split_text(text, max_length=MAX_MESSAGE_LENGTH):
+    """
+    Разбивает длинное сообщение на части: по переносу строки,
+    иначе по пробелу, иначе принудительно
+    """
+    if len(text) <= max_length:
+        return [text]
+
+    parts = []
+    while text:
+        if len(text) <= max_length:
+            parts.append(text)
+            break
+
+        split_pos = text.rfind('\n', 0, max_length)
+        if split_pos == -1:
+            split_pos = text.rfind(' ', 0, max_length)
+            if split_pos == -1:
+                split_pos = max_length
+
+        parts.append(text[:split_pos])
+        text = text[split_pos:].lstrip()
+
+    return parts
+
+
+class ScheduleRenderer:
+    """
+    Рендер расписания в HTML с кешем готовых сообщений.
+
+    Неизменяемые куски (заголовки времени пар, дни недели) собираются
+    один раз в конструкторе, сообщение склеивается через "".join.
+    Разбиение на части идёт по границам пар прямо при сборке, без
+    повторного сканирования готовой строки.
+
+    Кеш ключуется хешем содержимого расписания + группа, день и префикс:
+    все пользователи одной группы получают один и тот же результат,
+    а изменившееся расписание даёт новый ключ. Хеш считается один раз
+    на объект расписания: кеш расписаний отдаёт всем один и тот же
+    словарь, и повторно сериализовать его дороже, чем отрендерить.
+    """
+
+    def __init__(self, lesson_times, days_names, maxsize=2000, max_length=MAX_MESSAGE_LENGTH):
+        self.days_names = days_names
+        self.maxsize = maxsize
+        self.max_length = max_length
+
+        self._time_headers = {
+            lesson_num: f"<b>🕒 {time_slot}</b>\n" for lesson_num, time_slot in lesson_times.items()
+        }
+        self._unknown_time = "<b>🕒 ??:??</b>\n"
+        self._cache = OrderedDict()
+        # id(schedule_data) -> (schedule_data, хеш); ссылка на объект
+        # не даёт id переиспользоваться, пока запись жива
+        self._hashes = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def content_hash(schedule_data):
+        payload = json.dumps(schedule_data, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.blake2b(payload.encode(), digest_size=16).digest()
+
+    def render(self, schedule_data, group_id, day_number, day_prefix=""):
+        """
+        Готовый текст одним куском
+        """
+        return self._get(schedule_data, group_id, day_number, day_prefix)[0]
+
+    def render_parts(self, schedule_data, group_id, day_number, day_prefix=""):
+        """
+        Текст, уже разбитый на сообщения не длиннее max_length
+        """
+        return self._get(schedule_data, group_id, day_number, day_prefix)[1]
+
+    def _hash_of(self, schedule_data):
+        ident = id(schedule_data)
+        known = self._hashes.get(ident)
+        if known is not None and known[0] is schedule_data:
+            return known[1]
+        digest = self.content_hash(schedule_data)
+        self._hashes[ident] = (schedule_data, digest)
+        if len(self._hashes) > self.maxsize:
+            self._hashes.popitem(last=False)
+        return digest
+
+    def _get(self, schedule_data, group_id, day_number, day_prefix):
+        key = (self._hash_of(schedule_data), group_id, day_number, day_prefix)
+        entry = self._cache.get(key)
+        if entry is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        entry = self._build(schedule_data, group_id, day_number, day_prefix)
+        self._cache[key] = entry
+        if len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+        return entry
+
+    def header(self, group_id, day_number, day_prefix=""):
+        day_name = self.days_names[day_number]
+        day_display = f"{day_prefix} ({day_name})" if day_prefix else day_name
+        return f"📅 <b>{group_id} - {day_display}</b>\n\n"
+
+    def _blocks(self, schedule_data):
+        if not (isinstance(schedule_data, dict) and "lessons" in schedule_data):
+            yield "❌ <b>Расписание не найдено</b>\n"
+            return
+
+        lessons = schedule_data["lessons"]
+        if not lessons:
+            yield "🎉 <b>Занятий нет! Отдыхай!</b> 😊\n"
+            return
+
+        time_headers = self._time_headers
+        unknown_time = self._unknown_time
+        for lesson in lessons:
+            teacher = lesson.get('teacher', '')
+            classroom = lesson.get('classroom', '')
+            if teacher and classroom:
+                details = f"   👨‍🏫 {teacher} | 🏫 {classroom}\n"
+            elif teacher:
+                details = f"   👨‍🏫 {teacher}\n"
+            elif classroom:
+                details = f"   🏫 {classroom}\n"
+            else:
+                details = ""
+
+            yield (
+                f"{time_headers.get(lesson.get('lesson_num', 0), unknown_time)}"
+                f"   {lesson.get('subject', 'Предмет не указан')}\n{details}\n"
+            )
+
+    def _build(self, schedule_data, group_id, day_number, day_prefix):
+        blocks = [self.header(group_id, day_number, day_prefix)]
+        blocks.extend(self._blocks(schedule_data))
+        if isinstance(schedule_data, dict) and schedule_data.get("snapshot_at"):
+            # Копия из снимка на диске - API не ответил
+            saved_at = datetime.fromtimestamp(schedule_data["snapshot_at"])
+            blocks.append(f"⚠️ Сайт расписания недоступен, показана копия от {saved_at:%d.%m %H:%M}\n")
+        text = "".join(blocks)
+
+        if len(text) <= self.max_length:
+            return text, (text,)
+
+        # Режем готовый текст по границам целых пар (смещения известны
+        # из длин кусков); пара длиннее лимита режется как раньше
+        parts = []
+        start = end = 0
+        for block in blocks:
+            if end > start and end + len(block) - start > self.max_length:
+                parts.append(text[start:end].rstrip())
+                start = end
+            end += len(block)
+            if end - start > self.max_length:
+                parts.extend(split_text(text[start:end], self.max_length))
+                start = end
+        if end > start:
+            parts.append(text[start:end].rstrip())
+        return text, tuple(part for part in parts if part)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._cache),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpen(Exception):
+    """
+    Предохранитель разомкнут - в API не ходим
+    """
+
+
+class UpstreamError(Exception):
+    """
+    API ответил 5xx - считаем попытку неудачной
+    """
+
+    def __init__(self, status, text=""):
+        super().__init__(f"HTTP {status}: {text}")
+        self.status = status
+        self.text = text
+
+
+class CircuitBreaker:
+    """
+    Предохранитель для запросов к API: closed -> open -> half-open.
+
+    closed: запросы идут, считаем ошибки подряд. После failure_threshold
+    ошибок размыкаемся (open) на open_seconds - все вызовы сразу получают
+    CircuitOpen, а не ждут таймаут. Затем half-open: пропускаем не больше
+    half_open_max пробных запросов; успех замыкает цепь, ошибка снова
+    размыкает.
+
+    На каждый before() должен прийти ровно один success(), failure()
+    или release() (ответ, ничего не говорящий о здоровье API, например 429).
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name, failure_threshold=5, open_seconds=30, half_open_max=1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.half_open_max = half_open_max
+
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+
+        self.opened = 0
+        self.rejected = 0
+        self.successes = 0
+        self.failures = 0
+
+    def before(self):
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.open_seconds:
+                self.rejected += 1
+                raise CircuitOpen(self.name)
+            self._set_state(self.HALF_OPEN)
+            self._probes = 0
+
+        if self.state == self.HALF_OPEN:
+            if self._probes >= self.half_open_max:
+                self.rejected += 1
+                raise CircuitOpen(self.name)
+            self._probes += 1
+
+    def success(self):
+        self.successes += 1
+        self._failures = 0
+        if self.state == self.HALF_OPEN:
+            self._set_state(self.CLOSED)
+
+    def failure(self):
+        self.failures += 1
+        self._failures += 1
+        if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            self._open()
+
+    def release(self):
+        if self.state == self.HALF_OPEN and self._probes > 0:
+            self._probes -= 1
+
+    def _open(self):
+        if self.state != self.OPEN:
+            self.opened += 1
+        self._set_state(self.OPEN)
+        self._opened_at = time.monotonic()
+        self._failures = 0
+
+    def _set_state(self, state):
+        if state != self.state:
+            logger.warning(f"⚡ Предохранитель {self.name}: {self.state} -> {state}")
+            self.state = state
+
+    def stats(self):
+        return {
+            "state": self.state,
+            "opened": self.opened,
+            "rejected": self.rejected,
+            "successes": self.successes,
+            "failures": self.failures,
+        }
+
+
+class RetryPolicy:
+    """
+    Ограниченные повторы: не больше attempts повторов с экспоненциальной
+    паузой и полным джиттером (чтобы воркеры не били в API одновременно)
+    """
+
+    def __init__(self, attempts=2, base_delay=0.3, max_delay=2.0):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self.retries = 0
+
+    def delay(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    async def wait(self, attempt, deadline=None):
+        """
+        Пауза перед повтором номер attempt; False - повторов больше нет
+        (исчерпаны или не успеваем до deadline по часам loop)
+        """
+        if attempt > self.attempts:
+            return False
+        delay = self.delay(attempt)
+        if deadline is not None and asyncio.get_running_loop().time() + delay >= deadline:
+            return False
+        self.retries += 1
+        await asyncio.sleep(delay)
+        return True
+
+
+class Hedger:
+    """
+    Подстраховочные запросы от хвоста задержек.
+
+    Если попытка не ответила за percentile-й процентиль недавних задержек,
+    запускаем вторую и берём первый удачный ответ, вторую отменяем.
+    Пока замеров меньше min_samples, не подстраховываемся
+    """
+
+    def __init__(self, percentile=95, min_delay=0.3, min_samples=20, window=200):
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=window)
+
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def record(self, seconds):
+        self._latencies.append(seconds)
+
+    def delay(self):
+        if len(self._latencies) < self.min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return max(self.min_delay, ordered[index])
+
+    async def call(self, attempt, enabled=True, hedge=None):
+        """
+        attempt() - корутина одной попытки; исключение - неудачная попытка.
+        hedge() - подстраховочная попытка (по умолчанию attempt()): например,
+        со своим ожиданием лимита, которое не должно входить в задержку первой
+        """
+        self.calls += 1
+        first = asyncio.create_task(attempt())
+        tasks = {first}
+        try:
+            delay = self.delay() if enabled else None
+            if delay is None:
+                return await first
+
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                return first.result()
+
+            self.hedged += 1
+            second = asyncio.create_task((hedge or attempt)())
+            tasks.add(second)
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # Проигравшую (или всё ещё идущую при отмене) попытку отменяем
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "delay": self.delay(),
+        }
@@ -0,0 +1,251 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class ScheduleCache:
+    """
+    Кеш расписаний в памяти процесса: LRU с TTL и stale-while-revalidate.
+
+    Ключ - (group_id, day_of_week). Успешный ответ считается свежим ttl
+    секунд, затем ещё stale_ttl секунд отдаётся как устаревший, пока в фоне
+    идёт обновление. Ошибки (not_found, rate_limit) кешируются отдельно
+    на свои короткие сроки и устаревшими не отдаются.
+
+    С общим хранилищем (shared) записи дублируются туда, и промах
+    локального кеша сначала проверяется в нём - так воркеры не ходят
+    в API за тем, что уже загрузил соседний процесс.
+    """
+
+    def __init__(self, maxsize=5000, ttl=3600, stale_ttl=86400,
+                 not_found_ttl=600, rate_limit_ttl=10, shared=None):
+        self.maxsize = maxsize
+        self.shared = shared
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.negative_ttls = {
+            "not_found": not_found_ttl,
+            "rate_limit": rate_limit_ttl,
+        }
+
+        # key -> (value, fresh_until, stale_until)
+        self._data = OrderedDict()
+        self._refreshing = set()
+        self._tasks = set()
+        # Ключи, загруженные прогревом и ещё не запрошенные пользователями
+        self._prefetched = set()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.refreshes = 0
+        self.prefetches = 0
+        self.prefetch_served = 0
+        self.shared_hits = 0
+
+    @staticmethod
+    def make_key(group_id, day_of_week):
+        return str(group_id), int(day_of_week)
+
+    @staticmethod
+    def is_error(value):
+        return isinstance(value, dict) and "error" in value
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        """
+        Возвращает (значение, свежее_ли) или (None, False) при промахе
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None, False
+
+        value, fresh_until, stale_until = entry
+        now = time.monotonic()
+
+        if now < stale_until and key in self._prefetched:
+            self._prefetched.discard(key)
+            self.prefetch_served += 1
+
+        if now < fresh_until:
+            self._data.move_to_end(key)
+            if self.is_error(value):
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+            return value, True
+
+        if now < stale_until:
+            self._data.move_to_end(key)
+            self.stale_hits += 1
+            return value, False
+
+        del self._data[key]
+        self._prefetched.discard(key)
+        self.expirations += 1
+        self.misses += 1
+        return None, False
+
+    def fresh_for(self, key):
+        """
+        Сколько секунд запись ещё свежая (0 - нет или устарела).
+        Не трогает LRU и счётчики
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            return 0
+        return max(0.0, entry[1] - time.monotonic())
+
+    def peek(self, key):
+        """
+        Как get(), но для фоновых задач: не трогает LRU, счётчики
+        и отметки прогрева. Истёкшая запись - (None, False)
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            return None, False
+        value, fresh_until, stale_until = entry
+        now = time.monotonic()
+        if now >= stale_until:
+            return None, False
+        return value, now < fresh_until
+
+    def mark_prefetched(self, key):
+        if key in self._data:
+            self._prefetched.add(key)
+            self.prefetches += 1
+
+    def set(self, key, value):
+        """
+        Кладём ответ API в кеш. None (сетевые ошибки) не кешируем
+        """
+        if value is None:
+            return
+
+        now = time.monotonic()
+        if self.is_error(value):
+            ttl = self.negative_ttls.get(value.get("error"))
+            if not ttl:
+                return
+            # Не затираем ошибкой ещё пригодные данные
+            current = self._data.get(key)
+            if current is not None and not self.is_error(current[0]) and now < current[2]:
+                return
+            fresh_for = stale_for = ttl
+        else:
+            fresh_for, stale_for = self.ttl, self.ttl + self.stale_ttl
+
+        self._put(key, value, now + fresh_for, now + stale_for)
+
+        if self.shared is not None:
+            wall = time.time()
+            record = {"value": value, "fresh_until": wall + fresh_for, "stale_until": wall + stale_for}
+            self._spawn(self.shared.aset("schedule", self._shared_key(key), record, stale_for))
+
+    def restore(self, key, value, fetched_at):
+        """
+        Запись из снимка на диске после рестарта: сроки считаем от момента
+        загрузки из API (fetched_at, время на часах). Совсем старые и уже
+        загруженные ключи не трогаем
+        """
+        age = time.time() - fetched_at
+        if age >= self.ttl + self.stale_ttl or key in self._data:
+            return False
+        now = time.monotonic()
+        self._put(key, value, now + self.ttl - age, now + self.ttl + self.stale_ttl - age)
+        return True
+
+    def _put(self, key, value, fresh_until, stale_until):
+        self._data[key] = (value, fresh_until, stale_until)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            evicted, _ = self._data.popitem(last=False)
+            self._prefetched.discard(evicted)
+            self.evictions += 1
+
+    @staticmethod
+    def _shared_key(key):
+        return f"{key[0]}:{key[1]}"
+
+    async def get_shared(self, key):
+        """
+        Промах локального кеша: ищем в общем хранилище.
+        Возвращает (значение, свежее_ли) как get()
+        """
+        if self.shared is None:
+            return None, False
+        try:
+            record = await self.shared.aget("schedule", self._shared_key(key))
+        except Exception as e:
+            logger.error(f"🚫 Ошибка общего кеша: {e}")
+            return None, False
+        if record is None:
+            return None, False
+
+        # Переводим сроки из времени на часах в monotonic этого процесса
+        offset = time.monotonic() - time.time()
+        self._put(key, record["value"], record["fresh_until"] + offset, record["stale_until"] + offset)
+        self.shared_hits += 1
+        return record["value"], time.time() < record["fresh_until"]
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def refresh_in_background(self, key, fetch):
+        """
+        Запускаем фоновое обновление устаревшей записи (одно на ключ)
+        """
+        if key in self._refreshing:
+            return
+
+        async def _refresh():
+            try:
+                self.set(key, await fetch())
+                self.refreshes += 1
+            except Exception as e:
+                logger.error(f"🚫 Ошибка фонового обновления {key}: {e}")
+            finally:
+                self._refreshing.discard(key)
+
+        self._refreshing.add(key)
+        self._spawn(_refresh())
+
+    async def close(self):
+        """
+        Отменяем незавершённые фоновые обновления
+        """
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self):
+        lookups = self.hits + self.stale_hits + self.negative_hits + self.misses
+        served = self.hits + self.stale_hits + self.negative_hits
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "refreshes": self.refreshes,
+            "prefetches": self.prefetches,
+            "prefetch_served": self.prefetch_served,
+            "shared_hits": self.shared_hits,
+            "hit_ratio": served / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,289 @@
+import asyncio
+import bisect
+import logging
+import time
+
+from group_catalog import normalize
+
+logger = logging.getLogger(__name__)
+
+
+def parse_slots(lesson_times):
+    """
+    "8:30-10:00" -> {номер пары: (минута начала, минута конца)} от полуночи
+    """
+    slots = {}
+    for lesson_num, time_range in lesson_times.items():
+        start, end = (bell.strip().split(":") for bell in time_range.split("-"))
+        slots[lesson_num] = (int(start[0]) * 60 + int(start[1]), int(end[0]) * 60 + int(end[1]))
+    return slots
+
+
+def current_lesson(slots, now):
+    """
+    (номер пары, идёт ли она): идущая пара, а между парами - следующая;
+    (None, False) после последней
+    """
+    minute = now.hour * 60 + now.minute
+    for lesson_num, (start, end) in sorted(slots.items(), key=lambda item: item[1]):
+        if minute < end:
+            return lesson_num, minute >= start
+    return None, False
+
+
+class ScheduleIndex:
+    """
+    Обратные индексы по расписанию всех групп.
+
+    teacher -> (день, пара) -> {(группа, предмет, аудитория)}
+    classroom -> (день, пара) -> {(группа, предмет, преподаватель)}
+
+    Для каждой (группы, дня) помним, какие записи она внесла. При новом
+    расписании сравниваем с прежним и снимаем/добавляем только разницу -
+    остальные группы индекса не трогаются.
+    """
+
+    def __init__(self):
+        self._teachers = {}
+        self._rooms = {}
+        # Нормализованный ключ -> как писать в ответе
+        self._teacher_names = {}
+        self._room_names = {}
+        # Отсортированные ключи для поиска по началу фамилии / номера
+        self._teacher_keys = []
+        self._room_keys = []
+        # (группа, день) -> frozenset записей (преподаватель, аудитория, пара, предмет)
+        self._sources = {}
+
+        self.updates = 0
+        self.unchanged = 0
+        self.updated_at = None
+
+    @staticmethod
+    def _entries(schedule_data):
+        entries = set()
+        if not (isinstance(schedule_data, dict) and "lessons" in schedule_data):
+            return frozenset()
+        for lesson in schedule_data["lessons"] or []:
+            teacher = (lesson.get("teacher") or "").strip()
+            classroom = str(lesson.get("classroom") or "").strip()
+            if teacher or classroom:
+                entries.add((teacher, classroom, lesson.get("lesson_num", 0), lesson.get("subject", "")))
+        return frozenset(entries)
+
+    def update(self, group_id, day_of_week, schedule_data):
+        """
+        Учитываем свежее расписание группы на день; True - индекс изменился
+        """
+        if isinstance(schedule_data, dict) and "error" in schedule_data:
+            return False
+
+        source = (str(group_id), day_of_week)
+        new = self._entries(schedule_data)
+        old = self._sources.get(source, frozenset())
+        if new == old:
+            self.unchanged += 1
+            return False
+
+        for teacher, classroom, lesson_num, subject in old - new:
+            slot = (day_of_week, lesson_num)
+            if teacher:
+                self._remove(self._teachers, self._teacher_names, self._teacher_keys,
+                             teacher, slot, (source[0], subject, classroom))
+            if classroom:
+                self._remove(self._rooms, self._room_names, self._room_keys,
+                             classroom, slot, (source[0], subject, teacher))
+
+        for teacher, classroom, lesson_num, subject in new - old:
+            slot = (day_of_week, lesson_num)
+            if teacher:
+                self._add(self._teachers, self._teacher_names, self._teacher_keys,
+                          teacher, slot, (source[0], subject, classroom))
+            if classroom:
+                self._add(self._rooms, self._room_names, self._room_keys,
+                          classroom, slot, (source[0], subject, teacher))
+
+        if new:
+            self._sources[source] = new
+        else:
+            self._sources.pop(source, None)
+        self.updates += 1
+        self.updated_at = time.time()
+        return True
+
+    @staticmethod
+    def _add(index, names, keys, name, slot, posting):
+        key = normalize(name)
+        postings = index.get(key)
+        if postings is None:
+            postings = index[key] = {}
+            names[key] = name
+            bisect.insort(keys, key)
+        postings.setdefault(slot, set()).add(posting)
+
+    @staticmethod
+    def _remove(index, names, keys, name, slot, posting):
+        key = normalize(name)
+        postings = index.get(key)
+        if postings is None:
+            return
+        slot_postings = postings.get(slot)
+        if slot_postings is not None:
+            slot_postings.discard(posting)
+            if not slot_postings:
+                del postings[slot]
+        if not postings:
+            del index[key]
+            del names[key]
+            keys.pop(bisect.bisect_left(keys, key))
+
+    @staticmethod
+    def _find(keys, query, limit):
+        needle = normalize(query)
+        if not needle:
+            return []
+        found = []
+        position = bisect.bisect_left(keys, needle)
+        while position < len(keys) and keys[position].startswith(needle) and len(found) < limit:
+            found.append(keys[position])
+            position += 1
+        return found
+
+    def find_teachers(self, query, limit=5):
+        """
+        Преподаватели, чьё имя начинается с query: [(имя, ключ)]
+        """
+        return [(self._teacher_names[key], key) for key in self._find(self._teacher_keys, query, limit)]
+
+    def find_rooms(self, query, limit=5):
+        """
+        Аудитории по номеру: точное совпадение, иначе по началу номера
+        """
+        key = normalize(query)
+        if key in self._rooms:
+            return [(self._room_names[key], key)]
+        return [(self._room_names[key], key) for key in self._find(self._room_keys, query, limit)]
+
+    def teacher_day(self, key, day_of_week):
+        """
+        Пары преподавателя за день: [(пара, [(группа, предмет, аудитория)])]
+        """
+        return self._day(self._teachers.get(key, {}), day_of_week)
+
+    def room_day(self, key, day_of_week):
+        """
+        Занятость аудитории за день: [(пара, [(группа, предмет, преподаватель)])]
+        """
+        return self._day(self._rooms.get(key, {}), day_of_week)
+
+    @staticmethod
+    def _day(postings, day_of_week):
+        return sorted(
+            (lesson_num, sorted(entries))
+            for (day, lesson_num), entries in postings.items()
+            if day == day_of_week
+        )
+
+    def room_busy(self, key, day_of_week, lesson_num):
+        """
+        Кто занимает аудиторию на паре (пустой список - свободна)
+        """
+        return sorted(self._rooms.get(key, {}).get((day_of_week, lesson_num), ()))
+
+    def stats(self):
+        return {
+            "teachers": len(self._teachers),
+            "rooms": len(self._rooms),
+            "sources": len(self._sources),
+            "updates": self.updates,
+            "unchanged": self.unchanged,
+            "updated_at": self.updated_at,
+        }
+
+
+class ScheduleCrawler:
+    """
+    Фоновый обход всех групп и дней недели для ScheduleIndex.
+
+    Каждые interval секунд проходим groups() x дни 1-6 не быстрее rate
+    запросов в секунду (rate=None - без паузы, для чтения из общего кеша)
+    и отдаём результат в index.update. load(group_id, day) сам решает,
+    брать ли расписание из кеша или идти в API.
+    """
+
+    def __init__(self, index, groups, load, days=range(1, 7), rate=2.0, interval=21600):
+        self.index = index
+        self.groups = groups
+        self.load = load
+        self.days = days
+        self.rate = rate
+        self.interval = interval
+
+        self._task = None
+        self.passes = 0
+        self.loaded = 0
+        self.failed = 0
+        self.progress = 0
+        self.total = 0
+        self.last_pass_seconds = None
+
+    async def crawl(self):
+        """
+        Один полный обход
+        """
+        started = time.perf_counter()
+        targets = [(group_id, day) for group_id in list(self.groups()) for day in self.days]
+        self.total = len(targets)
+        self.progress = 0
+
+        for group_id, day in targets:
+            try:
+                schedule_data = await self.load(group_id, day)
+                if schedule_data is not None:
+                    self.index.update(group_id, day, schedule_data)
+                    self.loaded += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"🚫 Ошибка обхода {group_id}, день {day}: {e}")
+            self.progress += 1
+            if self.rate:
+                await asyncio.sleep(1 / self.rate)
+
+        self.passes += 1
+        self.last_pass_seconds = time.perf_counter() - started
+        index = self.index.stats()
+        logger.info(
+            f"🕸 Обход расписаний за {self.last_pass_seconds:.0f}с: "
+            f"преподавателей {index['teachers']}, аудиторий {index['rooms']}"
+        )
+
+    async def _run(self):
+        while True:
+            try:
+                await self.crawl()
+            except Exception as e:
+                logger.error(f"🚫 Ошибка обхода расписаний: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self):
+        return {
+            "passes": self.passes,
+            "progress": self.progress,
+            "total": self.total,
+            "loaded": self.loaded,
+            "failed": self.failed,
+            "last_pass_seconds": self.last_pass_seconds,
+        }
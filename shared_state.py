@@ -0,0 +1,158 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class SharedBackend:
+    """
+    Общее для нескольких процессов хранилище ключ-значение с TTL
+    и межпроцессными локами.
+
+    Методы синхронные и быстрые; из event loop их зовут через
+    asyncio.to_thread (обёртки aget/aset/alock).
+    """
+
+    def get(self, namespace, key):
+        raise NotImplementedError
+
+    def set(self, namespace, key, value, ttl=None):
+        raise NotImplementedError
+
+    def try_lock(self, name, owner, ttl):
+        raise NotImplementedError
+
+    def unlock(self, name, owner):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    async def aget(self, namespace, key):
+        return await asyncio.to_thread(self.get, namespace, key)
+
+    async def aset(self, namespace, key, value, ttl=None):
+        await asyncio.to_thread(self.set, namespace, key, value, ttl)
+
+    @asynccontextmanager
+    async def alock(self, name, ttl=30.0, poll=0.05):
+        """
+        Межпроцессный лок. ttl защищает от процесса, упавшего с локом
+        """
+        owner = f"{os.getpid()}:{id(asyncio.current_task())}"
+        while not await asyncio.to_thread(self.try_lock, name, owner, ttl):
+            await asyncio.sleep(poll)
+        try:
+            yield
+        finally:
+            await asyncio.to_thread(self.unlock, name, owner)
+
+
+class SqliteSharedBackend(SharedBackend):
+    """
+    Общее состояние в файле SQLite (WAL) - для воркеров на одной машине
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+
+    def _conn(self):
+        # Соединение на поток: to_thread берёт потоки из общего пула
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS shared_kv ("
+                "namespace TEXT NOT NULL, "
+                "key TEXT NOT NULL, "
+                "value TEXT NOT NULL, "
+                "expires_at REAL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS shared_locks ("
+                "name TEXT PRIMARY KEY, "
+                "owner TEXT NOT NULL, "
+                "expires_at REAL NOT NULL)"
+            )
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def get(self, namespace, key):
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM shared_kv WHERE namespace = ? AND key = ?",
+            (namespace, key),
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at is not None and expires_at <= time.time():
+            return None
+        return json.loads(value)
+
+    def set(self, namespace, key, value, ttl=None):
+        expires_at = time.time() + ttl if ttl else None
+        self._conn().execute(
+            "INSERT INTO shared_kv (namespace, key, value, expires_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(namespace, key) DO UPDATE SET "
+            "value = excluded.value, expires_at = excluded.expires_at",
+            (namespace, key, json.dumps(value, ensure_ascii=False), expires_at),
+        )
+
+    def try_lock(self, name, owner, ttl):
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT owner, expires_at FROM shared_locks WHERE name = ?", (name,)
+            ).fetchone()
+            if row is not None and row[0] != owner and row[1] > now:
+                conn.execute("ROLLBACK")
+                return False
+            conn.execute(
+                "INSERT INTO shared_locks (name, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at",
+                (name, owner, now + ttl),
+            )
+            conn.execute("COMMIT")
+            return True
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def unlock(self, name, owner):
+        self._conn().execute(
+            "DELETE FROM shared_locks WHERE name = ? AND owner = ?", (name, owner)
+        )
+
+    def close(self):
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+def create_shared_backend(kind, path=None):
+    """
+    Общее хранилище по имени из конфигурации: "sqlite" или "none"
+    """
+    if kind == "sqlite":
+        return SqliteSharedBackend(path)
+    if kind in ("none", "", None):
+        return None
+    raise ValueError(f"Неизвестное общее хранилище: {kind}")
@@ -0,0 +1,210 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+
+class ScheduleSnapshot:
+    """
+    Последние удачные ответы API на диске (last known good).
+
+    Успешно загруженные расписания копятся в памяти и пачкой пишутся в
+    SQLite из фоновой задачи - запросы пользователей диск не ждут.
+    Значение хранится как сжатый JSON, файл читается через mmap, так что
+    чтение одной записи при сбое API почти бесплатно.
+
+    Храним не больше max_entries записей и не старше max_age секунд:
+    при каждой записи удаляются самые старые.
+    """
+
+    def __init__(self, path, max_entries=20000, max_age=14 * 86400, flush_interval=30,
+                 mmap_size=64 * 1024 * 1024):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.flush_interval = flush_interval
+        self.mmap_size = mmap_size
+
+        # key -> (value, fetched_at)
+        self._dirty = {}
+        self._flush_lock = asyncio.Lock()
+        self._task = None
+        self._conn = None
+        self._conn_lock = threading.Lock()
+
+        self.recorded = 0
+        self.written = 0
+        self.flushes = 0
+        self.evicted = 0
+        self.loaded = 0
+        self.served = 0
+        self.load_seconds = 0.0
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS schedule_snapshot ("
+                "group_id TEXT NOT NULL, "
+                "day_of_week INTEGER NOT NULL, "
+                "fetched_at REAL NOT NULL, "
+                "payload BLOB NOT NULL, "
+                "PRIMARY KEY (group_id, day_of_week))"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS schedule_snapshot_fetched_at ON schedule_snapshot (fetched_at)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def _encode(value):
+        return zlib.compress(json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode())
+
+    @staticmethod
+    def _decode(payload):
+        return json.loads(zlib.decompress(payload))
+
+    def record(self, key, value):
+        """
+        Запоминаем удачный ответ API (запишется при следующем сбросе)
+        """
+        self._dirty[key] = (value, time.time())
+        self.recorded += 1
+
+    async def get(self, key):
+        """
+        Последняя удачная версия: (значение, когда загружено) или None
+        """
+        entry = self._dirty.get(key)
+        if entry is None:
+            try:
+                entry = await asyncio.to_thread(self._read, key)
+            except Exception as e:
+                logger.error(f"🚫 Ошибка чтения снимка {key}: {e}")
+                return None
+        if entry is None or time.time() - entry[1] > self.max_age:
+            return None
+        self.served += 1
+        return entry
+
+    def _read(self, key):
+        with self._conn_lock:
+            row = self._connect().execute(
+                "SELECT payload, fetched_at FROM schedule_snapshot WHERE group_id = ? AND day_of_week = ?",
+                key,
+            ).fetchone()
+        if row is None:
+            return None
+        return self._decode(row[0]), row[1]
+
+    async def load(self, max_age=None):
+        """
+        Записи не старше max_age (по умолчанию self.max_age) для прогрева
+        кеша при старте: [(key, value, fetched_at)], новые первыми
+        """
+        started = time.perf_counter()
+        since = time.time() - (max_age if max_age is not None else self.max_age)
+        rows = await asyncio.to_thread(self._load_since, since)
+        self.loaded = len(rows)
+        self.load_seconds = time.perf_counter() - started
+        logger.info(f"💾 Из снимка загружено {self.loaded} расписаний за {self.load_seconds:.2f}с")
+        return rows
+
+    def _load_since(self, since):
+        with self._conn_lock:
+            rows = self._connect().execute(
+                "SELECT group_id, day_of_week, fetched_at, payload FROM schedule_snapshot "
+                "WHERE fetched_at >= ? ORDER BY fetched_at DESC LIMIT ?",
+                (since, self.max_entries),
+            ).fetchall()
+        return [((group_id, day), self._decode(payload), fetched_at) for group_id, day, fetched_at, payload in rows]
+
+    async def flush(self):
+        """
+        Пишем накопленное на диск и вытесняем старое
+        """
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+            batch, self._dirty = self._dirty, {}
+            try:
+                self.evicted += await asyncio.to_thread(self._write_batch, batch)
+            except Exception as e:
+                logger.error(f"🚫 Ошибка записи снимка расписаний: {e}")
+                for key, entry in batch.items():
+                    self._dirty.setdefault(key, entry)
+                raise
+            self.flushes += 1
+            self.written += len(batch)
+
+    def _write_batch(self, batch):
+        rows = [(key[0], key[1], fetched_at, self._encode(value)) for key, (value, fetched_at) in batch.items()]
+        with self._conn_lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    "INSERT INTO schedule_snapshot (group_id, day_of_week, fetched_at, payload) "
+                    "VALUES (?, ?, ?, ?) ON CONFLICT(group_id, day_of_week) DO UPDATE SET "
+                    "fetched_at = excluded.fetched_at, payload = excluded.payload",
+                    rows,
+                )
+                evicted = conn.execute(
+                    "DELETE FROM schedule_snapshot WHERE fetched_at < ?", (time.time() - self.max_age,)
+                ).rowcount
+                evicted += conn.execute(
+                    "DELETE FROM schedule_snapshot WHERE rowid IN ("
+                    "SELECT rowid FROM schedule_snapshot ORDER BY fetched_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                ).rowcount
+        return evicted
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                pass
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """
+        Останавливаем фоновую запись и сбрасываем остаток
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        finally:
+            with self._conn_lock:
+                if self._conn is not None:
+                    self._conn.close()
+                    self._conn = None
+
+    def stats(self):
+        return {
+            "pending": len(self._dirty),
+            "recorded": self.recorded,
+            "written": self.written,
+            "evicted": self.evicted,
+            "loaded": self.loaded,
+            "served": self.served,
+            "load_seconds": self.load_seconds,
+        }
@@ -0,0 +1,297 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+from collections import deque
+
+from aiogram.exceptions import TelegramRetryAfter
+
+from rate_governor import Priority
+
+logger = logging.getLogger(__name__)
+
+
+class _Job:
+    __slots__ = ("call", "future", "queued_at", "priority", "attempts", "context")
+
+    def __init__(self, call, future, queued_at, priority):
+        self.call = call
+        self.future = future
+        self.queued_at = queued_at
+        self.priority = priority
+        self.attempts = 0
+        # Контекст отправителя (trace id апдейта): доставка идёт в нём,
+        # а не в контексте того, кто первым запустил _run
+        self.context = contextvars.copy_context()
+
+
+class MessageDispatcher:
+    """
+    Очередь исходящих сообщений в Telegram.
+
+    Соблюдает общий лимит (global_rate сообщений в секунду) и лимит на чат
+    (не чаще раза в per_chat_interval секунд), сохраняет порядок сообщений
+    внутри чата и повторяет отправку после TelegramRetryAfter. Одновременно
+    в очереди не больше max_pending сообщений - остальные отправители ждут.
+
+    Готовые к отправке чаты стоят в очередях по приоритету (Priority):
+    ответ пользователю уходит раньше уже поставленной пачки рассылки.
+    Приоритет чата - у его первого сообщения, порядок внутри чата не меняется.
+    """
+
+    def __init__(self, bot, global_rate=30.0, per_chat_interval=1.0,
+                 max_pending=10000, max_attempts=5, on_sent=None):
+        self.bot = bot
+        self.global_rate = global_rate
+        self.per_chat_interval = per_chat_interval
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        # on_sent(задержка от постановки в очередь до доставки) - для метрик
+        self.on_sent = on_sent
+
+        self._capacity = asyncio.Semaphore(max_pending)
+        # chat_id -> очередь задач этого чата
+        self._chats = {}
+        # приоритет -> куча (когда можно отправлять, seq, chat_id) - чаты без задачи в полёте
+        self._ready = {}
+        # приоритет -> сообщений в очереди; _idle - какая-то очередь опустела
+        self._lane_pending = {}
+        self._idle = asyncio.Event()
+        self._seq = itertools.count()
+        # chat_id -> не раньше какого времени следующая отправка
+        self._next_at = {}
+        self._tokens = global_rate
+        self._updated = None
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._in_flight = set()
+
+        self.pending = 0
+        self.sent = 0
+        self.failed = 0
+        self.retry_after = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    async def submit(self, chat_id, call, priority=Priority.INTERACTIVE):
+        """
+        Ставим в очередь чата вызов API (функцию без аргументов,
+        возвращающую корутину) и ждём результат
+        """
+        return (await self.submit_many(chat_id, [call], priority))[0]
+
+    async def submit_many(self, chat_id, calls, priority=Priority.INTERACTIVE):
+        """
+        Несколько вызовов подряд - они уйдут в чат именно в этом порядке
+        """
+        if len(calls) > self.max_pending:
+            # Столько мест в очереди не освободится никогда
+            raise ValueError(f"{len(calls)} сообщений больше, чем max_pending={self.max_pending}")
+        acquired = 0
+        try:
+            for _ in calls:
+                await self._capacity.acquire()
+                acquired += 1
+        except asyncio.CancelledError:
+            # Отменили на полпути (например, при остановке вебхука) - места возвращаем
+            for _ in range(acquired):
+                self._capacity.release()
+            raise
+
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        jobs = [_Job(call, loop.create_future(), now, int(priority)) for call in calls]
+
+        queue = self._chats.get(chat_id)
+        scheduled = queue is not None
+        if queue is None:
+            queue = self._chats[chat_id] = deque()
+        queue.extend(jobs)
+        if not scheduled:
+            self._schedule(chat_id, now)
+        self.pending += len(jobs)
+        self._lane_pending[int(priority)] = self._lane_pending.get(int(priority), 0) + len(jobs)
+
+        self._ensure_worker()
+        self._wakeup.set()
+        results = await asyncio.gather(*(job.future for job in jobs), return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return results
+
+    async def send(self, chat_id, text, **kwargs):
+        return await self.submit(chat_id, lambda: self.bot.send_message(chat_id, text, **kwargs))
+
+    async def send_parts(self, chat_id, parts, priority=Priority.INTERACTIVE, **kwargs):
+        """
+        Отправляем части длинного сообщения по порядку
+        """
+        return await self.submit_many(
+            chat_id,
+            [lambda part=part: self.bot.send_message(chat_id, part, **kwargs) for part in parts],
+            priority,
+        )
+
+    async def wait_idle(self, priority):
+        """
+        Ждём, пока в очередях приоритетнее priority не останется сообщений
+        (рассылка подкладывает следующую пачку только в затишье)
+        """
+        while any(count for lane, count in self._lane_pending.items() if lane < priority):
+            self._idle.clear()
+            await self._idle.wait()
+
+    def _schedule(self, chat_id, now):
+        ready_at = max(now, self._next_at.get(chat_id, 0.0))
+        lane = self._ready.setdefault(self._chats[chat_id][0].priority, [])
+        heapq.heappush(lane, (ready_at, next(self._seq), chat_id))
+
+    def _next_ready(self, now):
+        """
+        Самая приоритетная очередь, где чат уже можно отправлять, и 0;
+        иначе None и сколько ждать до ближайшего (None - ждать нечего)
+        """
+        wait = None
+        for priority in sorted(self._ready):
+            lane = self._ready[priority]
+            if not lane:
+                continue
+            if lane[0][0] <= now:
+                return lane, 0
+            wait = lane[0][0] - now if wait is None else min(wait, lane[0][0] - now)
+        return None, wait
+
+    def _ensure_worker(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def _refill(self, now):
+        if self._updated is not None:
+            self._tokens = min(self.global_rate, self._tokens + (now - self._updated) * self.global_rate)
+        self._updated = now
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            self._refill(now)
+
+            lane, wait = self._next_ready(now)
+            if lane is None:
+                pass
+            elif self._tokens < 1:
+                wait = (1 - self._tokens) / self.global_rate
+            else:
+                _, _, chat_id = heapq.heappop(lane)
+                self._tokens -= 1
+                job = self._chats[chat_id].popleft()
+                task = asyncio.create_task(self._deliver(chat_id, job), context=job.context)
+                self._in_flight.add(task)
+                task.add_done_callback(self._in_flight.discard)
+                continue
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _deliver(self, chat_id, job):
+        loop = asyncio.get_running_loop()
+        job.attempts += 1
+        started = loop.time()
+        next_at = started + self.per_chat_interval
+        done = True
+
+        try:
+            if job.future.cancelled():
+                # Отправитель уже не ждёт - не тратим лимит чата
+                next_at = self._next_at.get(chat_id, started)
+                result = None
+            else:
+                result = await job.call()
+        except TelegramRetryAfter as e:
+            self.retry_after += 1
+            next_at = loop.time() + e.retry_after
+            if job.attempts < self.max_attempts:
+                logger.warning(f"⏳ Telegram просит подождать {e.retry_after}с (чат {chat_id})")
+                self._chats[chat_id].appendleft(job)
+                done = False
+            else:
+                self._fail(job, e)
+        except Exception as e:
+            self._fail(job, e)
+        else:
+            if not job.future.done():
+                latency = loop.time() - job.queued_at
+                self.sent += 1
+                self.latency_total += latency
+                self.latency_max = max(self.latency_max, latency)
+                if self.on_sent is not None:
+                    self.on_sent(latency)
+                job.future.set_result(result)
+
+        if done:
+            self.pending -= 1
+            self._lane_pending[job.priority] -= 1
+            if not self._lane_pending[job.priority]:
+                self._idle.set()
+            self._capacity.release()
+
+        self._next_at[chat_id] = next_at
+        if self._chats[chat_id]:
+            self._schedule(chat_id, loop.time())
+        else:
+            del self._chats[chat_id]
+            self._prune(loop.time())
+        self._wakeup.set()
+
+    def _fail(self, job, error):
+        self.failed += 1
+        if not job.future.done():
+            job.future.set_exception(error)
+
+    def _prune(self, now):
+        # Не копим время последней отправки по всем чатам навсегда
+        if len(self._next_at) > 10000:
+            self._next_at = {
+                chat_id: next_at for chat_id, next_at in self._next_at.items()
+                if next_at > now or chat_id in self._chats
+            }
+
+    async def close(self, timeout=10):
+        """
+        Дожидаемся отправки очереди (не дольше timeout) и останавливаемся
+        """
+        loop = asyncio.get_running_loop()
+        stop_at = loop.time() + timeout
+        while self.pending and loop.time() < stop_at:
+            await asyncio.sleep(0.05)
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for task in list(self._in_flight):
+            task.cancel()
+        for queue in self._chats.values():
+            for job in queue:
+                job.future.cancel()
+        self._chats.clear()
+        self._ready.clear()
+
+    def stats(self):
+        return {
+            "queue_depth": self.pending,
+            "chats": len(self._chats),
+            "sent": self.sent,
+            "failed": self.failed,
+            "retry_after": self.retry_after,
+            "latency_avg": self.latency_total / self.sent if self.sent else 0.0,
+            "latency_max": self.latency_max,
+        }
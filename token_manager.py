@@ -0,0 +1,326 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from rate_governor import Priority, parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+# Обновить токен безусловно, даже если его только что обновили
+_FORCE = object()
+
+
+class TokenManager:
+    """
+    Хранит JWT токены API и обновляет их в фоне заранее до истечения.
+
+    Обновление и вход сериализованы одним локом: сколько бы корутин ни
+    увидели протухший токен, к API уйдёт один /refresh (или /login).
+    Горячий путь - чтение атрибута access_token.
+
+    С общим хранилищем (shared) токены одни на все воркеры: перед
+    обновлением берём межпроцессный лок и сначала смотрим, не обновил
+    ли токен соседний процесс.
+    """
+
+    def __init__(self, client, username, password, refresh_margin=300,
+                 retry_attempts=3, retry_base_delay=1.0, retry_max_delay=30.0,
+                 governor=None, shared=None, on_response=None):
+        self.client = client
+        self.governor = governor
+        self.shared = shared
+        self.username = username
+        self.password = password
+        self.refresh_margin = timedelta(seconds=refresh_margin)
+        self.retry_attempts = retry_attempts
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        # on_response(секунды, endpoint=..., status=...) - для метрик
+        self.on_response = on_response
+
+        self.access_token = None
+        self.refresh_token = None
+        self.expires_at = None
+        self._issued_at = None
+
+        self._lock = asyncio.Lock()
+        self._task = None
+
+        self.logins = 0
+        self.refreshes = 0
+        self.failures = 0
+        self.adopted = 0
+
+    def _now(self):
+        # API может отдать время как с часовым поясом, так и без
+        if self.expires_at is not None and self.expires_at.tzinfo is not None:
+            return datetime.now(self.expires_at.tzinfo)
+        return datetime.now()
+
+    @property
+    def is_valid(self):
+        if not self.access_token:
+            return False
+        return self.expires_at is None or self._now() < self.expires_at
+
+    @property
+    def expires_in(self):
+        if self.expires_at is None:
+            return None
+        return self.expires_at - self._now()
+
+    def _store(self, data):
+        self.access_token = data["access_token"]
+        self.refresh_token = data["refresh_token"]
+        self.expires_at = datetime.fromisoformat(data["access_token_expires_at"])
+        # Из общего хранилища приходит время выдачи - иначе _margin() посчитал
+        # бы срок жизни от момента, когда мы взяли чужой токен
+        issued_at = data.get("issued_at")
+        self._issued_at = datetime.fromisoformat(issued_at) if issued_at else self._now()
+
+    def _margin(self):
+        if self.expires_at is None or self._issued_at is None:
+            return self.refresh_margin
+        # Для короткоживущих токенов обновляем на середине срока жизни
+        return min(self.refresh_margin, (self.expires_at - self._issued_at) / 2)
+
+    def _dump(self):
+        return {
+            "access_token": self.access_token,
+            "refresh_token": self.refresh_token,
+            "access_token_expires_at": self.expires_at.isoformat(),
+            "issued_at": self._issued_at.isoformat(),
+        }
+
+    async def _adopt_shared(self, stale_token):
+        """
+        Берём токен из общего хранилища, если соседний процесс уже
+        получил новый и он не скоро истекает
+        """
+        try:
+            record = await self.shared.aget("tokens", "jwt")
+        except Exception as e:
+            logger.error(f"🚫 Ошибка чтения общего токена: {e}")
+            return False
+        if not record or record["access_token"] in (stale_token, self.access_token):
+            return False
+
+        previous = (self.access_token, self.refresh_token, self.expires_at, self._issued_at)
+        self._store(record)
+        if self.expires_in is None or self.expires_in > self._margin():
+            self.adopted += 1
+            logger.info("🔄 Токен получен от соседнего воркера")
+            return True
+        self.access_token, self.refresh_token, self.expires_at, self._issued_at = previous
+        return False
+
+    def _on_status(self, response, permit):
+        # 429 на вход тормозит и остальные запросы к API, как в fetch_schedule
+        if self.governor is None:
+            return
+        if response.status == 429:
+            self.governor.on_rate_limited(parse_retry_after(response.headers.get("Retry-After")), permit)
+        else:
+            self.governor.on_success()
+
+    def _observe(self, endpoint, status, started):
+        if self.on_response is not None and started is not None:
+            self.on_response(asyncio.get_running_loop().time() - started, endpoint=endpoint, status=status)
+
+    async def login(self):
+        """
+        Получаем JWT токен через JSON API /login
+        """
+        started, status = None, "error"
+        try:
+            auth_data = {
+                "username": self.username,
+                "password": self.password
+            }
+            logger.info("🔐 Получаем JWT токен...")
+
+            permit = None
+            if self.governor is not None:
+                # Вне очереди: запросы расписания ждут новый токен
+                permit = await self.governor.acquire(Priority.AUTH)
+
+            started = asyncio.get_running_loop().time()
+            async with self.client.post(
+                "/login",
+                json=auth_data,
+                headers={"Content-Type": "application/json"}
+            ) as response:
+
+                status = response.status
+                logger.info(f"📡 Статус аутентификации: {response.status}")
+                self._on_status(response, permit)
+
+                if response.status == 200:
+                    self._store(await response.json())
+                    self.logins += 1
+                    logger.info("✅ JWT токен успешно получен!")
+                    return True
+
+                elif response.status == 400:
+                    error_data = await response.json()
+                    logger.error(f"❌ Ошибка 400: {error_data.get('msg', 'Неверный формат данных')}")
+                    return False
+
+                elif response.status == 401:
+                    error_data = await response.json()
+                    logger.error(f"❌ Ошибка 401: {error_data.get('msg', 'Неверные учетные данные')}")
+                    return False
+
+                else:
+                    logger.error(f"❌ Ошибка {response.status}")
+                    return False
+
+        except Exception as e:
+            if isinstance(e, asyncio.TimeoutError):
+                status = "timeout"
+            logger.error(f"🚫 Ошибка при получении токена: {e}")
+            return False
+        finally:
+            self._observe("login", status, started)
+
+    async def refresh(self):
+        """
+        Обновляем JWT токен используя refresh token
+        """
+        if not self.refresh_token:
+            return False
+
+        started, status = None, "error"
+        try:
+            headers = {
+                "Authorization": f"Bearer {self.refresh_token}",
+                "Content-Type": "application/json"
+            }
+
+            permit = None
+            if self.governor is not None:
+                # Вне очереди: запросы расписания ждут новый токен
+                permit = await self.governor.acquire(Priority.AUTH)
+
+            started = asyncio.get_running_loop().time()
+            async with self.client.post("/refresh", headers=headers) as response:
+                status = response.status
+                self._on_status(response, permit)
+
+                if response.status == 200:
+                    self._store(await response.json())
+                    self.refreshes += 1
+                    logger.info("🔄 Токен успешно обновлен!")
+                    return True
+                else:
+                    logger.error(f"❌ Ошибка обновления токена: {response.status}")
+                    return False
+
+        except Exception as e:
+            if isinstance(e, asyncio.TimeoutError):
+                status = "timeout"
+            logger.error(f"🚫 Ошибка обновления токена: {e}")
+            return False
+        finally:
+            self._observe("refresh", status, started)
+
+    async def renew(self, stale_token=_FORCE):
+        """
+        Обновляем токен под локом: refresh, при неудаче - полный вход,
+        с повторами и экспоненциальной задержкой.
+
+        stale_token - токен, который вызывающий считает плохим (например,
+        получил с ним 401). Если пока ждали лок его уже заменили - выходим.
+        """
+        async with self._lock:
+            if stale_token is not _FORCE and self.access_token != stale_token and self.is_valid:
+                return True
+
+            if self.shared is None:
+                return await self._renew()
+
+            if await self._adopt_shared(stale_token):
+                return True
+            async with self.shared.alock("jwt", ttl=60):
+                # Пока ждали лок, токен мог обновить другой воркер
+                if await self._adopt_shared(stale_token):
+                    return True
+                if not await self._renew():
+                    return False
+                try:
+                    await self.shared.aset("tokens", "jwt", self._dump())
+                except Exception as e:
+                    logger.error(f"🚫 Ошибка записи общего токена: {e}")
+                return True
+
+    async def _renew(self):
+        """
+        refresh или вход с повторами (вызывается под локом)
+        """
+        delay = self.retry_base_delay
+        for attempt in range(1, self.retry_attempts + 1):
+            if await self.refresh() or await self.login():
+                return True
+
+            self.failures += 1
+            if attempt < self.retry_attempts:
+                logger.warning(f"⏳ Не удалось обновить токен, повтор через {delay:.0f}с")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.retry_max_delay)
+
+        logger.error("❌ Не удалось получить токен после всех попыток")
+        return False
+
+    async def ensure(self):
+        """
+        Проверяем что токен валиден; без ожидания, если всё в порядке
+        """
+        if self.is_valid:
+            return True
+        return await self.renew(stale_token=self.access_token)
+
+    def start(self):
+        """
+        Запускаем фоновое обновление токена
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _refresh_delay(self):
+        """
+        Сколько секунд ждать до планового обновления
+        """
+        if not self.access_token or self.expires_at is None:
+            return 0
+        return (self.expires_in - self._margin()).total_seconds()
+
+    async def _run(self):
+        while True:
+            wait = self._refresh_delay()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+
+            logger.info("🔄 Токен скоро истекает, обновляем...")
+            if not await self.renew(stale_token=self.access_token):
+                # Все попытки неудачны - пробуем снова позже
+                await asyncio.sleep(self.retry_max_delay)
+
+    def stats(self):
+        return {
+            "valid": self.is_valid,
+            "expires_in": self.expires_in,
+            "logins": self.logins,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "adopted": self.adopted,
+        }
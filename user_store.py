@@ -0,0 +1,233 @@
+import asyncio
+import logging
+import sqlite3
+import sys
+import threading
+import time
+from collections.abc import MutableMapping
+
+logger = logging.getLogger(__name__)
+
+
+class UserGroupStore(MutableMapping):
+    """
+    Выбранные группы пользователей: индекс в памяти + отложенная запись.
+
+    Чтение идёт только из словаря в памяти. Изменения копятся и
+    сбрасываются в хранилище пачками из фоновой задачи (раз в
+    flush_interval секунд или сразу при batch_size изменений).
+    Наследники реализуют _load_all, _write_batch и _close.
+    """
+
+    def __init__(self, flush_interval=1.0, batch_size=500):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+
+        self._index = {}
+        # user_id -> group_id (None - удалить)
+        self._dirty = {}
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = None
+
+        self.flushes = 0
+        self.written = 0
+        self.load_seconds = 0.0
+
+    def __getitem__(self, user_id):
+        return self._index[user_id]
+
+    def __setitem__(self, user_id, group_id):
+        group_id = sys.intern(str(group_id))
+        if self._index.get(user_id) == group_id:
+            return
+        self._index[user_id] = group_id
+        self._mark_dirty(user_id, group_id)
+
+    def __delitem__(self, user_id):
+        del self._index[user_id]
+        self._mark_dirty(user_id, None)
+
+    def __contains__(self, user_id):
+        return user_id in self._index
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+    def _mark_dirty(self, user_id, group_id):
+        self._dirty[user_id] = group_id
+        if len(self._dirty) >= self.batch_size:
+            self._wakeup.set()
+
+    async def load(self):
+        """
+        Загружаем всех пользователей в память (при старте)
+        """
+        started = time.perf_counter()
+        loaded = await asyncio.to_thread(self._load_all)
+        # Изменения, сделанные до окончания загрузки, важнее
+        loaded.update((user_id, group_id) for user_id, group_id in self._index.items())
+        self._index = loaded
+        self.load_seconds = time.perf_counter() - started
+        logger.info(f"👥 Загружено {len(self._index)} пользователей за {self.load_seconds:.2f}с")
+
+    async def flush(self):
+        """
+        Сбрасываем накопленные изменения в хранилище
+        """
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+            batch, self._dirty = self._dirty, {}
+            try:
+                await asyncio.to_thread(self._write_batch, batch)
+            except Exception as e:
+                logger.error(f"🚫 Ошибка записи групп пользователей: {e}")
+                # Возвращаем в очередь, не затирая более свежие изменения
+                for user_id, group_id in batch.items():
+                    self._dirty.setdefault(user_id, group_id)
+                raise
+            self.flushes += 1
+            self.written += len(batch)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                await asyncio.sleep(self.flush_interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """
+        Останавливаем фоновую запись и сбрасываем остаток
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        finally:
+            await asyncio.to_thread(self._close)
+
+    def stats(self):
+        return {
+            "users": len(self._index),
+            "pending": len(self._dirty),
+            "flushes": self.flushes,
+            "written": self.written,
+            "load_seconds": self.load_seconds,
+        }
+
+    def _load_all(self):
+        raise NotImplementedError
+
+    def _write_batch(self, batch):
+        raise NotImplementedError
+
+    def _close(self):
+        pass
+
+
+class MemoryUserGroupStore(UserGroupStore):
+    """
+    Без постоянного хранения - как раньше обычный словарь
+    """
+
+    def _load_all(self):
+        return {}
+
+    def _write_batch(self, batch):
+        pass
+
+
+class SqliteUserGroupStore(UserGroupStore):
+    """
+    Хранение в локальном SQLite в режиме WAL.
+
+    shard=(index, count) - воркер загружает только своих пользователей
+    (user_id % count == index); в одну базу пишут все воркеры
+    """
+
+    def __init__(self, path, flush_interval=1.0, batch_size=500, shard=None):
+        super().__init__(flush_interval=flush_interval, batch_size=batch_size)
+        self.path = path
+        self.shard = shard
+        self._conn = None
+        self._conn_lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS user_groups ("
+                "user_id INTEGER PRIMARY KEY, "
+                "group_id TEXT NOT NULL, "
+                "updated_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _load_all(self):
+        with self._conn_lock:
+            if self.shard is None:
+                rows = self._connect().execute("SELECT user_id, group_id FROM user_groups")
+            else:
+                index, count = self.shard
+                rows = self._connect().execute(
+                    "SELECT user_id, group_id FROM user_groups WHERE user_id % ? = ?", (count, index)
+                )
+            intern = sys.intern
+            return {user_id: intern(group_id) for user_id, group_id in rows}
+
+    def _write_batch(self, batch):
+        now = time.time()
+        upserts = [(user_id, group_id, now) for user_id, group_id in batch.items() if group_id is not None]
+        deletes = [(user_id,) for user_id, group_id in batch.items() if group_id is None]
+
+        with self._conn_lock:
+            conn = self._connect()
+            with conn:
+                if upserts:
+                    conn.executemany(
+                        "INSERT INTO user_groups (user_id, group_id, updated_at) VALUES (?, ?, ?) "
+                        "ON CONFLICT(user_id) DO UPDATE SET "
+                        "group_id = excluded.group_id, updated_at = excluded.updated_at",
+                        upserts,
+                    )
+                if deletes:
+                    conn.executemany("DELETE FROM user_groups WHERE user_id = ?", deletes)
+
+    def _close(self):
+        with self._conn_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def create_user_store(kind, path=None, flush_interval=1.0, batch_size=500, shard=None):
+    """
+    Хранилище групп по имени из конфигурации: "sqlite" или "memory"
+    """
+    if kind == "sqlite":
+        return SqliteUserGroupStore(path, flush_interval=flush_interval, batch_size=batch_size, shard=shard)
+    if kind == "memory":
+        return MemoryUserGroupStore(flush_interval=flush_interval, batch_size=batch_size)
+    raise ValueError(f"Неизвестное хранилище групп: {kind}")
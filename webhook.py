@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import signal
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookServer:
+    """
+    Приём апдейтов Telegram через вебхук на aiohttp.
+
+    Апдейт сразу подтверждается (200), а обрабатывается в фоне теми же
+    хендлерами dp. Одновременно обрабатывается не больше max_concurrency
+    апдейтов; если принятых, но не обработанных больше max_pending,
+    отвечаем 503 - Telegram повторит доставку позже.
+
+    router - вместо обработки в этом процессе отдаём сырой апдейт
+    функции router(update) -> bool (например, пулу воркеров); False
+    означает, что принять некуда, и Telegram получает 503.
+    """
+
+    def __init__(self, dp, bot, path="/webhook", secret=None,
+                 max_concurrency=100, max_pending=1000, router=None):
+        self.dp = dp
+        self.bot = bot
+        self.path = path
+        self.secret = secret
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self.router = router
+
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._tasks = set()
+        self._closing = False
+
+        self.accepted = 0
+        self.rejected = 0
+        self.processed = 0
+        self.failed = 0
+
+    def make_app(self):
+        app = web.Application()
+        app.router.add_post(self.path, self.handle)
+        app.router.add_get("/healthz", self.health)
+        return app
+
+    @property
+    def pending(self):
+        return len(self._tasks)
+
+    async def handle(self, request):
+        if self.secret and request.headers.get("X-Telegram-Bot-Api-Secret-Token") != self.secret:
+            return web.Response(status=403)
+
+        if self._closing or self.pending >= self.max_pending:
+            self.rejected += 1
+            return web.Response(status=503, headers={"Retry-After": "1"})
+
+        try:
+            update = await request.json()
+        except ValueError:
+            return web.Response(status=400)
+
+        if self.router is not None:
+            if not self.router(update):
+                self.rejected += 1
+                return web.Response(status=503, headers={"Retry-After": "1"})
+            self.accepted += 1
+            return web.Response(status=200)
+
+        self.accepted += 1
+        task = asyncio.create_task(self._process(update))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return web.Response(status=200)
+
+    async def health(self, request):
+        return web.json_response(self.stats())
+
+    async def _process(self, update):
+        async with self._semaphore:
+            try:
+                await self.dp.feed_raw_update(self.bot, update)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"🚫 Ошибка обработки апдейта {update.get('update_id')}: {e}")
+
+    async def drain(self, timeout=30):
+        """
+        Перестаём принимать апдейты и ждём уже принятые
+        """
+        self._closing = True
+        if not self._tasks:
+            return
+        logger.info(f"⏳ Дожидаемся обработки {len(self._tasks)} апдейтов...")
+        done, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning(f"⚠️ Не дождались {len(pending)} апдейтов")
+
+    async def run(self, host, port, url, drain_timeout=30):
+        """
+        Поднимаем сервер, регистрируем вебхук и работаем до SIGINT/SIGTERM
+        """
+        runner = web.AppRunner(self.make_app())
+        await runner.setup()
+        site = web.TCPSite(runner, host, port)
+        await site.start()
+        logger.info(f"🌍 Вебхук слушает {host}:{port}{self.path}")
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass
+
+        try:
+            await self.bot.set_webhook(
+                f"{url.rstrip('/')}{self.path}",
+                secret_token=self.secret,
+                allowed_updates=self.dp.resolve_used_update_types(),
+                max_connections=min(self.max_concurrency, 100),
+            )
+            await stop.wait()
+        finally:
+            await self.drain(drain_timeout)
+            await runner.cleanup()
+            logger.info("🌍 Вебхук остановлен")
+
+    def stats(self):
+        return {
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "processed": self.processed,
+            "failed": self.failed,
+        }
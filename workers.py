@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import multiprocessing
+import queue
+
+logger = logging.getLogger(__name__)
+
+
+def shard_key(update):
+    """
+    По какому id распределять апдейт: пользователь, а если его нет - чат.
+    В личке это одно и то же, так что все апдейты чата попадают в один
+    воркер и его группа есть в памяти этого воркера
+    """
+    for kind in ("message", "edited_message", "callback_query", "inline_query",
+                 "chosen_inline_result", "my_chat_member"):
+        payload = update.get(kind)
+        if not payload:
+            continue
+        user = payload.get("from")
+        if user:
+            return user["id"]
+        chat = payload.get("chat") or (payload.get("message") or {}).get("chat")
+        if chat:
+            return chat["id"]
+    return update.get("update_id", 0)
+
+
+class WorkerPool:
+    """
+    N процессов-воркеров, апдейты распределяются по shard_key.
+
+    У каждого воркера своя ограниченная очередь: если она полна,
+    dispatch возвращает False и слушатель отвечает Telegram 503.
+    target(index, count, updates, *args) запускается в отдельном процессе.
+    """
+
+    def __init__(self, count, target, args=(), queue_size=1000):
+        self.count = count
+        self.target = target
+        self.args = args
+        self.queue_size = queue_size
+
+        # spawn: форк процесса с запущенным event loop небезопасен
+        self._context = multiprocessing.get_context("spawn")
+        self._queues = []
+        self._processes = []
+
+        self.dispatched = 0
+        self.rejected = 0
+
+    def start(self):
+        for index in range(self.count):
+            updates = self._context.Queue(self.queue_size)
+            process = self._context.Process(
+                target=self.target,
+                args=(index, self.count, updates, *self.args),
+                name=f"ebot-worker-{index}",
+                daemon=True,
+            )
+            process.start()
+            self._queues.append(updates)
+            self._processes.append(process)
+        logger.info(f"👷 Запущено воркеров: {self.count}")
+
+    def dispatch(self, update):
+        index = shard_key(update) % self.count
+        try:
+            self._queues[index].put_nowait(update)
+        except queue.Full:
+            self.rejected += 1
+            return False
+        self.dispatched += 1
+        return True
+
+    def close(self, timeout=30):
+        """
+        Сообщаем воркерам об остановке и ждём, пока они разберут очереди
+        """
+        for updates in self._queues:
+            updates.put(None)
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                logger.warning(f"⚠️ Воркер {process.name} не остановился, завершаем")
+                process.terminate()
+        self._queues.clear()
+        self._processes.clear()
+
+    def stats(self):
+        return {
+            "workers": self.count,
+            "alive": sum(process.is_alive() for process in self._processes),
+            "dispatched": self.dispatched,
+            "rejected": self.rejected,
+        }
+
+
+async def consume_updates(updates, handle, concurrency=100):
+    """
+    Цикл воркера: читаем очередь процесса и обрабатываем не больше
+    concurrency апдейтов одновременно. None в очереди - сигнал остановки;
+    уже начатые апдейты дорабатываем
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = set()
+
+    async def _process(update):
+        try:
+            await handle(update)
+        except Exception as e:
+            logger.error(f"🚫 Ошибка обработки апдейта {update.get('update_id')}: {e}")
+        finally:
+            semaphore.release()
+
+    while True:
+        await semaphore.acquire()
+        update = await asyncio.to_thread(updates.get)
+        if update is None:
+            semaphore.release()
+            break
+        task = asyncio.create_task(_process(update))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    if tasks:
+        await asyncio.wait(tasks)
+
+
+async def poll_updates(bot, dispatch, allowed_updates=None, stop=None, timeout=25):
+    """
+    Long polling в одном процессе с раздачей апдейтов воркерам
+    """
+    offset = None
+    while stop is None or not stop.is_set():
+        try:
+            batch = await bot.get_updates(offset=offset, timeout=timeout, allowed_updates=allowed_updates)
+        except Exception as e:
+            logger.error(f"🚫 Ошибка получения апдейтов: {e}")
+            await asyncio.sleep(1)
+            continue
+
+        for update in batch:
+            raw = update.model_dump(mode="json", by_alias=True, exclude_none=True)
+            # Очередь воркера полна - ждём, а не теряем апдейт
+            while not dispatch(raw):
+                await asyncio.sleep(0.05)
+            offset = update.update_id + 1